@@ -10,27 +10,40 @@ Created by Dylan Araps.
 """
 
 import argparse
+import concurrent.futures
+import functools
+import importlib
 import logging
 import os
-import shutil
 import sys
 
-from . import (
-    cache,
-    colors,
-    config,
-    export,
-    image,
-    parallel,
-    reload,
-    sequences,
-    theme,
-    util,
-    wallpaper,
-)
+from . import util
 from .settings import CACHE_DIR, CONF_DIR, __version__
 
+# Submodules that are only imported by the code paths that need them, so
+# trivial invocations like 'wal -v' don't pay for loading all of them.
+_LAZY_MODULES = (
+    "cache",
+    "colors",
+    "config",
+    "export",
+    "image",
+    "parallel",
+    "reload",
+    "sequences",
+    "theme",
+    "wallpaper",
+)
+
+
+def __getattr__(name):
+    """Keep the lazily imported submodules reachable as attributes."""
+    if name in _LAZY_MODULES:
+        return importlib.import_module(f".{name}", __package__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
+
+@functools.lru_cache(maxsize=1)
 def get_args():
     """Get the script arguments."""
     description = "wal - Generate colorschemes on the fly"
@@ -39,8 +52,7 @@ def get_args():
     arg.add_argument(
         "-a",
         metavar='"alpha"',
-        help="Set terminal background transparency. \
-                           *Only works in URxvt*",
+        help="Set terminal background transparency. *Only works in URxvt*",
     )
 
     arg.add_argument("-b", metavar="background", help="Custom background color to use.")
@@ -48,8 +60,7 @@ def get_args():
     arg.add_argument(
         "--backend",
         metavar="backend",
-        help="Which color backend to use. \
-                           Use 'wal --backend' to list backends.",
+        help="Which color backend to use. Use 'wal --backend' to list backends.",
         const="list_backends",
         type=str,
         nargs="?",
@@ -59,8 +70,8 @@ def get_args():
         "--theme",
         "-f",
         metavar="/path/to/file or theme_name",
-        help="Which colorscheme file to use. \
-                           Use 'wal --theme' to list builtin and user themes.",
+        help="Which colorscheme file to use. "
+        "Use 'wal --theme' to list builtin and user themes.",
         const="list_themes",
         nargs="?",
     )
@@ -125,8 +136,7 @@ def get_args():
     arg.add_argument(
         "-r",
         action="store_true",
-        help="'wal -r' is deprecated: Use \
-                           (cat ~/.cache/wal/sequences &) instead.",
+        help="'wal -r' is deprecated: Use (cat ~/.cache/wal/sequences &) instead.",
     )
 
     arg.add_argument("-R", action="store_true", help="Restore previous colorscheme.")
@@ -202,10 +212,31 @@ def get_args():
     return arg
 
 
-def parse_args_exit(parser):
-    """Process args that exit."""
-    args = parser.parse_args()
+def clear_cache():
+    """Delete all cached color schemes."""
+    from . import cache
+
+    cache.get_cache().clear_all()
+
+
+def parse_fast_exit(argv):
+    """Handle lone exit flags without building the argparse parser."""
+    if argv == ["-v"]:
+        sys.stdout.write(f"wal {__version__}\n")
+        sys.exit(0)
+
+    if argv == ["-c"]:
+        clear_cache()
+        sys.exit(0)
+
+    if argv == ["--cache-info"]:
+        from . import cache
 
+        sys.exit(cache.cache_info_cli())
+
+
+def parse_args_exit(parser, args):
+    """Process args that exit."""
     if len(sys.argv) <= 1:
         parser.print_help()
         sys.exit(1)
@@ -214,6 +245,8 @@ def parse_args_exit(parser):
         parser.exit(0, f"wal {__version__}\n")
 
     if args.preview:
+        from . import colors
+
         sys.stdout.write("Current colorscheme:")
         colors.palette()
         sys.exit(0)
@@ -222,50 +255,61 @@ def parse_args_exit(parser):
         parser.error("Conflicting arguments -i and -f.")
 
     if args.r:
+        from . import reload
+
         reload.colors()
         sys.exit(0)
 
     if args.c:
-        scheme_dir = os.path.join(CACHE_DIR, "schemes")
-        shutil.rmtree(scheme_dir, ignore_errors=True)
+        clear_cache()
         sys.exit(0)
 
-    if (
-        not args.i
-        and not args.theme
-        and not args.R
-        and not args.w
-        and not args.backend
-        and not args.validate_config
-        and not args.repair_config
-        and not args.migrate_config
-        and not args.benchmark
-        and not args.cache_info
-        and not args.cache_cleanup
+    if not any(
+        (
+            args.i,
+            args.theme,
+            args.R,
+            args.w,
+            args.backend,
+            args.validate_config,
+            args.repair_config,
+            args.migrate_config,
+            args.benchmark,
+            args.cache_info,
+            args.cache_cleanup,
+        )
     ):
         parser.error("No input specified.\n--backend, --theme, -i or -R are required.")
 
     if args.theme == "list_themes":
+        from . import theme
+
         theme.list_out()
         sys.exit(0)
 
     if args.backend == "list_backends":
+        from . import colors
+
         sys.stdout.write(
             "\n - ".join(["\033[1;32mBackends\033[0m:", *colors.list_backends()])
         )
         sys.exit(0)
 
-    if args.validate_config:
-        sys.exit(config.validate_config_cli())
+    if args.validate_config or args.repair_config or args.migrate_config:
+        from . import config
+
+        if args.validate_config:
+            sys.exit(config.validate_config_cli())
 
-    if args.repair_config:
-        sys.exit(config.repair_config_cli())
+        if args.repair_config:
+            sys.exit(config.repair_config_cli())
 
-    if args.migrate_config:
         sys.exit(config.migrate_config_cli())
 
     if args.benchmark and args.i:
         if os.path.isfile(args.i):
+            from . import parallel
+
             sys.stdout.write("Starting backend benchmark...\n")
             # Use fast, reliable backends by default to avoid hanging
             fast_backends = ["wal", "colorthief", "haishoku"]
@@ -280,48 +324,43 @@ def parse_args_exit(parser):
                 sys.stdout.write("  pip install colorz\n")
                 sys.exit(1)
 
-            sys.stdout.write("\nBenchmark Results:\n")
-            sys.stdout.write("=" * 70 + "\n")
+            out = ["\nBenchmark Results:\n", "=" * 70 + "\n"]
 
             # Separate available and unavailable backends
-            available = {
-                k: v
-                for k, v in results.items()
-                if v.get("status") == "available" and v["success_count"] > 0
-            }
-            failed = {
-                k: v
-                for k, v in results.items()
-                if v.get("status") == "available" and v["success_count"] == 0
-            }
-            unavailable = {
-                k: v for k, v in results.items() if v.get("status") == "unavailable"
-            }
+            available, failed, unavailable = {}, {}, {}
+            for k, v in results.items():
+                status = v.get("status")
+                if status == "unavailable":
+                    unavailable[k] = v
+                elif status == "available":
+                    if v["success_count"] > 0:
+                        available[k] = v
+                    else:
+                        failed[k] = v
 
             if available:
-                sys.stdout.write("Available backends (sorted by performance):\n")
+                out.append("Available backends (sorted by performance):\n")
                 for backend, stats in sorted(
                     available.items(), key=lambda x: x[1]["avg_time"]
                 ):
                     min_time = stats.get("min_time", 0)
                     max_time = stats.get("max_time", 0)
-                    sys.stdout.write(
+                    out.append(
                         f"{backend:15} | Avg: {stats['avg_time']:.3f}s | "
                         f"Range: {min_time:.3f}-{max_time:.3f}s | Success: {stats['success_rate']:.1%}\n"
                     )
 
             if failed:
-                sys.stdout.write("\nFailed backends:\n")
+                out.append("\nFailed backends:\n")
                 for backend in failed:
-                    sys.stdout.write(f"{backend:15} | All iterations failed\n")
+                    out.append(f"{backend:15} | All iterations failed\n")
 
             if unavailable:
-                sys.stdout.write("\nUnavailable backends:\n")
+                out.append("\nUnavailable backends:\n")
                 for backend in unavailable:
-                    sys.stdout.write(
-                        f"{backend:15} | Missing dependencies or import error\n"
-                    )
+                    out.append(f"{backend:15} | Missing dependencies or import error\n")
 
+            sys.stdout.write("".join(out))
             sys.exit(0)
         else:
             parser.error(
@@ -331,10 +370,12 @@ def parse_args_exit(parser):
     if args.find_best and not args.parallel:
         parser.error("--find-best requires --parallel to be enabled")
 
-    if args.cache_info:
-        sys.exit(cache.cache_info_cli())
+    if args.cache_info or args.cache_cleanup:
+        from . import cache
+
+        if args.cache_info:
+            sys.exit(cache.cache_info_cli())
 
-    if args.cache_cleanup:
         sys.exit(cache.cache_cleanup_cli())
 
 
@@ -342,7 +383,16 @@ def setup_quiet_mode(args):
     """Configure quiet mode if requested."""
     if args.q:
         logging.getLogger().disabled = True
-        sys.stdout = sys.stderr = open(os.devnull, "w")
+
+        # Point fds 1 and 2 at /dev/null rather than only swapping the
+        # Python objects, so C-level writes and child processes that
+        # inherit our stdout/stderr are silenced as well.
+        sys.stdout.flush()
+        sys.stderr.flush()
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, 1)
+        os.dup2(devnull, 2)
+        os.close(devnull)
 
 
 def setup_alpha(args):
@@ -352,11 +402,18 @@ def setup_alpha(args):
 
 
 def get_colors_from_args(args, parser):
-    """Extract colors from various input sources."""
+    """Extract colors from various input sources and apply overrides."""
+    from . import colors, image, parallel, theme
+
     colors_plain = None
 
+    # Generated schemes are cached by image content, backend, light and
+    # saturation, so the backend has to be a real name for the lookup to
+    # work; colors.get() falls back to 'wal' anyway when none is given.
+    backend = args.backend or "wal"
+
     if args.i:
-        if os.path.isdir(args.i) and args.parallel:
+        if args.parallel and os.path.isdir(args.i):
             # Use parallel processing for directories
             if args.find_best:
                 sys.stdout.write(
@@ -381,13 +438,14 @@ def get_colors_from_args(args, parser):
             else:
                 # Process all images and pick one
                 sys.stdout.write("Processing directory with parallel backend...\n")
-                all_results = parallel.process_directory_parallel(
-                    args.i, light=args.l, recursive=args.recursive, find_best=False
+                results = parallel.iter_directory_parallel(
+                    args.i, light=args.l, recursive=args.recursive
                 )
-                if all_results:
-                    # Pick the first successful result
-                    image_file = list(all_results.keys())[0]
-                    colors_plain = list(all_results.values())[0]
+                # Pick the first successful result and cancel the rest
+                first_result = next(results, None)
+                results.close()
+                if first_result:
+                    image_file, colors_plain = first_result
                     sys.stdout.write(f"Using: {os.path.basename(image_file)}\n")
                 else:
                     logging.error("Failed to process any images in directory.")
@@ -397,9 +455,7 @@ def get_colors_from_args(args, parser):
             image_file = image.get(
                 args.i, iterative=args.iterative, recursive=args.recursive
             )
-            colors_plain = colors.get(
-                image_file, args.l, args.backend, sat=args.saturate
-            )
+            colors_plain = colors.get(image_file, args.l, backend, sat=args.saturate)
 
     if args.theme:
         colors_plain = theme.file(args.theme, args.l)
@@ -408,10 +464,8 @@ def get_colors_from_args(args, parser):
         colors_plain = theme.file(os.path.join(CACHE_DIR, "colors.json"))
 
     if args.w:
-        cached_wallpaper = util.read_file(os.path.join(CACHE_DIR, "wal"))
-        colors_plain = colors.get(
-            cached_wallpaper[0], args.l, args.backend, sat=args.saturate
-        )
+        cached_wallpaper = util.read_first_line(os.path.join(CACHE_DIR, "wal"))
+        colors_plain = colors.get(cached_wallpaper, args.l, backend, sat=args.saturate)
 
     # Validate that we have valid input
     if colors_plain is None:
@@ -423,38 +477,46 @@ def get_colors_from_args(args, parser):
         else:
             parser.error("No input specified.\n-i, --theme, -R, or -w are required.")
 
+    # Apply the custom background while we still hold the palette.
+    if args.b:
+        background = f"#{args.b.strip('#')}"
+        colors_plain["special"]["background"] = background
+        colors_plain["colors"]["color0"] = background
+
     return colors_plain
 
 
-def apply_color_modifications(colors_plain, args):
-    """Apply color modifications like custom background."""
-    if args.b:
-        args.b = f"#{args.b.strip('#')}"
-        colors_plain["special"]["background"] = args.b
-        colors_plain["colors"]["color0"] = args.b
+def handle_wallpaper_and_theme_saving(colors_plain, args, executor):
+    """Queue wallpaper setting and theme saving."""
+    from . import theme, wallpaper
 
+    tasks = []
 
-def handle_wallpaper_and_theme_saving(colors_plain, args):
-    """Handle wallpaper setting and theme saving."""
     if not args.n:
-        wallpaper.change(colors_plain["wallpaper"])
+        tasks.append(executor.submit(wallpaper.change, colors_plain["wallpaper"]))
 
     if args.p:
-        theme.save(colors_plain, args.p, args.l)
+        tasks.append(executor.submit(theme.save, colors_plain, args.p, args.l))
 
+    return tasks
 
-def apply_colors_and_export(colors_plain, args):
-    """Apply colors to terminals and export templates."""
-    sequences.send(colors_plain, to_send=not args.s, vte_fix=args.vte)
 
-    if sys.stdout.isatty():
-        colors.palette()
+def apply_colors_and_export(colors_plain, args, executor):
+    """Queue applying colors to terminals and exporting templates."""
+    from . import export, sequences
+
+    return [
+        executor.submit(
+            sequences.send, colors_plain, to_send=not args.s, vte_fix=args.vte
+        ),
+        executor.submit(export.every, colors_plain),
+    ]
 
-    export.every(colors_plain)
 
+def reload_env_and_run_scripts(args):
+    """Reload the environment, then run the external scripts."""
+    from . import reload
 
-def handle_reloading_and_scripts(args):
-    """Handle environment reloading and external scripts."""
     if not args.e:
         reload.env(tty_reload=not args.t)
 
@@ -462,35 +524,62 @@ def handle_reloading_and_scripts(args):
         for cmd in args.o:
             util.disown([cmd])
 
+
+def handle_reloading_and_scripts(args, executor):
+    """Queue environment reloading and external scripts."""
+    from . import reload
+
+    tasks = [executor.submit(reload_env_and_run_scripts, args)]
+
     if not args.e:
-        reload.gtk()
+        tasks.append(executor.submit(reload.gtk))
+
+    return tasks
 
 
-def parse_args(parser):
+def wait_for(tasks):
+    """Wait for queued tasks, re-raising the first error."""
+    for task in tasks:
+        task.result()
+
+
+def parse_args(parser, args):
     """Process args."""
-    args = parser.parse_args()
+    from . import colors
 
     setup_quiet_mode(args)
     setup_alpha(args)
 
     colors_plain = get_colors_from_args(args, parser)
-    apply_color_modifications(colors_plain, args)
-    handle_wallpaper_and_theme_saving(colors_plain, args)
-    apply_colors_and_export(colors_plain, args)
-    handle_reloading_and_scripts(args)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+        # Setting the wallpaper, saving the theme, sending sequences and
+        # exporting templates don't depend on each other.
+        wait_for(
+            handle_wallpaper_and_theme_saving(colors_plain, args, executor)
+            + apply_colors_and_export(colors_plain, args, executor)
+        )
+
+        if sys.stdout.isatty():
+            colors.palette()
+
+        # Reloading picks up the exported templates, so it has to wait.
+        wait_for(handle_reloading_and_scripts(args, executor))
 
 
 def main():
     """Main script function."""
-    util.create_dir(os.path.join(CONF_DIR, "templates"))
-    util.create_dir(os.path.join(CONF_DIR, "colorschemes/light/"))
-    util.create_dir(os.path.join(CONF_DIR, "colorschemes/dark/"))
+    for directory in ("templates", "colorschemes/light/", "colorschemes/dark/"):
+        util.create_dir(os.path.join(CONF_DIR, directory))
 
     util.setup_logging()
+    parse_fast_exit(sys.argv[1:])
+
     parser = get_args()
+    args = parser.parse_args()
 
-    parse_args_exit(parser)
-    parse_args(parser)
+    parse_args_exit(parser, args)
+    parse_args(parser, args)
 
 
 if __name__ == "__main__":
@@ -5,21 +5,112 @@ This module provides enhanced caching capabilities including cache cleanup,
 analytics, compression, and performance optimizations.
 """
 
+import atexit
+import contextlib
+import copy
 import gzip
 import hashlib
 import json
 import logging
+import mmap
 import os
+import queue
 import shutil
 import sqlite3
 import sys
+import threading
 import time
+from collections import OrderedDict
 from dataclasses import dataclass, field
 from typing import Any, Dict, List, Optional, Tuple
 
 from . import util
 from .settings import CACHE_DIR, __cache_version__, __version__
 
+# Number of distinct cache hits batched before access stats are written.
+PENDING_HITS_LIMIT = 32
+
+# Number of decompressed payloads get() keeps in memory.
+MEMORY_CACHE_SIZE = 32
+
+# Number of removed entries after which the database is analyzed and vacuumed.
+COMPACT_THRESHOLD = 100
+
+# Tables and indexes of the current cache schema, and the indexes it replaced.
+SCHEMA_OBJECTS = frozenset(
+    {
+        "cache_entries",
+        "cache_stats",
+        "idx_accessed_access",
+        "idx_access_accessed",
+        "idx_image_hash",
+        "idx_payload_hash",
+    }
+)
+OBSOLETE_INDEXES = ("idx_last_accessed", "idx_access_count")
+
+try:
+    import xxhash
+
+except ImportError:
+    xxhash = None
+
+try:
+    import orjson
+
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+
+except ImportError:
+    zstandard = None
+
+# Errors raised when a cached payload can't be decompressed.
+_DECOMPRESS_ERRORS = (gzip.BadGzipFile,) + (
+    (zstandard.ZstdError,) if zstandard is not None else ()
+)
+
+
+def _dumps(data: Dict[str, Any]) -> bytes:
+    """Serialize a color scheme to compact UTF-8 JSON, with orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(data)
+
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+def _loads(data: bytes) -> Dict[str, Any]:
+    """Deserialize a color scheme, with orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+
+    return json.loads(data)
+
+
+def _new_hasher():
+    """Return a fast non-cryptographic hasher for image fingerprints."""
+    if xxhash is not None:
+        return xxhash.xxh3_128()
+
+    return hashlib.blake2b(digest_size=16)
+
+
+def _short_digest(data: bytes) -> str:
+    """Return a 16 character hex digest of data for use as a cache key."""
+    if xxhash is not None:
+        return xxhash.xxh3_64_hexdigest(data)
+
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def _tmp_path(path: str) -> str:
+    """Return a temporary name next to path, unique to this writer."""
+    # Processes and threads writing the same key must not share a name, or
+    # one os.replace() would move the file another is still writing.
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
 
 @dataclass
 class CacheEntry:
@@ -61,14 +152,67 @@ class AdvancedCache:
         self.db_path = os.path.join(cache_dir, "cache.db")
         self.stats = CacheStats()
 
+        # One connection is shared by every call (and every thread of the
+        # parallel processor), so it is guarded by a re-entrant lock: get()
+        # calls _remove_entry() while already holding it.
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+
+        # Image fingerprints keyed by (path, size, mtime_ns), so repeated
+        # lookups of the same wallpaper don't re-read the file.
+        self._hash_cache: Dict[Tuple[str, int, int], str] = {}
+
+        # Cache hits not yet written back: key -> (last_accessed, hits).
+        self._pending_hits: Dict[str, Tuple[float, int]] = {}
+
+        # Recently read payloads, least recently used first. The serialized
+        # bytes are kept rather than the dict, since callers modify the
+        # scheme they are given.
+        self._mem_lru: OrderedDict[str, bytes] = OrderedDict()
+
+        # Total time spent serving cache hits, averaged in get_analytics().
+        self._access_time_ns = 0
+        self._access_count = 0
+
+        # Writes queued by queue_put(), drained by a daemon thread that is
+        # started on first use.
+        self._write_q: queue.Queue[Tuple[tuple, Dict[str, Any]]] = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+
         # Ensure cache directories exist
         util.create_dir(self.schemes_dir)
         self._init_database()
 
     def _init_database(self):
-        """Initialize the cache database."""
+        """Open the cache database and create its tables."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            self._conn = sqlite3.connect(
+                self.db_path, check_same_thread=False, isolation_level=None
+            )
+            atexit.register(self.close)
+
+            # WAL avoids the rollback-journal fsync on every write and lets
+            # readers share the page cache. auto_vacuum only takes effect on
+            # a new database, before its tables are created.
+            for pragma in (
+                "PRAGMA auto_vacuum=INCREMENTAL",
+                "PRAGMA journal_mode=WAL",
+                "PRAGMA synchronous=NORMAL",
+                "PRAGMA temp_store=MEMORY",
+                "PRAGMA mmap_size=268435456",
+                "PRAGMA cache_size=-20000",
+            ):
+                self._conn.execute(pragma)
+
+            # Skip the schema setup, and its locks, when it is already done
+            cursor = self._conn.execute(
+                "SELECT name FROM sqlite_master WHERE name IN (?, ?, ?, ?, ?, ?, ?, ?)",
+                (*SCHEMA_OBJECTS, *OBSOLETE_INDEXES),
+            )
+            if {name for (name,) in cursor} == SCHEMA_OBJECTS:
+                return
+
+            with self._db(transaction=True) as conn:
                 conn.execute("""
                     CREATE TABLE IF NOT EXISTS cache_entries (
                         key TEXT PRIMARY KEY,
@@ -79,10 +223,21 @@ class AdvancedCache:
                         access_count INTEGER DEFAULT 0,
                         backend TEXT DEFAULT 'unknown',
                         image_hash TEXT DEFAULT '',
-                        compressed INTEGER DEFAULT 0
+                        compressed INTEGER DEFAULT 0,
+                        payload_hash TEXT DEFAULT ''
                     )
                 """)
 
+                # Databases created before payload hashes were stored
+                columns = {
+                    row[1] for row in conn.execute("PRAGMA table_info(cache_entries)")
+                }
+                if "payload_hash" not in columns:
+                    conn.execute(
+                        "ALTER TABLE cache_entries "
+                        "ADD COLUMN payload_hash TEXT DEFAULT ''"
+                    )
+
                 conn.execute("""
                     CREATE TABLE IF NOT EXISTS cache_stats (
                         id INTEGER PRIMARY KEY,
@@ -94,23 +249,175 @@ class AdvancedCache:
                     )
                 """)
 
+                # Composite indexes matching the cleanup() orderings; they
+                # supersede the old single-column ones.
+                conn.execute("DROP INDEX IF EXISTS idx_last_accessed")
+                conn.execute("DROP INDEX IF EXISTS idx_access_count")
+
+                conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_accessed_access
+                    ON cache_entries(last_accessed ASC, access_count ASC)
+                """)
+
+                conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_access_accessed
+                    ON cache_entries(access_count DESC, last_accessed DESC)
+                """)
+
                 conn.execute("""
-                    CREATE INDEX IF NOT EXISTS idx_last_accessed
-                    ON cache_entries(last_accessed)
+                    CREATE INDEX IF NOT EXISTS idx_image_hash
+                    ON cache_entries(image_hash) WHERE image_hash != ''
                 """)
 
                 conn.execute("""
-                    CREATE INDEX IF NOT EXISTS idx_access_count
-                    ON cache_entries(access_count DESC)
+                    CREATE INDEX IF NOT EXISTS idx_payload_hash
+                    ON cache_entries(payload_hash) WHERE payload_hash != ''
                 """)
 
         except sqlite3.Error as e:
             logging.warning(f"Cache database initialization failed: {e}")
 
+    @contextlib.contextmanager
+    def _db(self, transaction: bool = False):
+        """Yield the shared connection while holding the cache lock.
+
+        The connection runs in autocommit mode, so single statements commit
+        on their own. With transaction=True the block runs inside BEGIN
+        IMMEDIATE and is committed, or rolled back on error, as a whole.
+        """
+        with self._lock:
+            if self._conn is None:
+                raise sqlite3.Error("cache database is not open")
+
+            if not transaction:
+                yield self._conn
+                return
+
+            self._conn.execute("BEGIN IMMEDIATE")
+            with self._conn:
+                yield self._conn
+
+    def _flush_hits(self) -> None:
+        """Write the batched access statistics back in one transaction."""
+        with self._lock:
+            if not self._pending_hits:
+                return
+
+            rows = [
+                (last_accessed, hits, key)
+                for key, (last_accessed, hits) in self._pending_hits.items()
+            ]
+            self._pending_hits.clear()
+
+            try:
+                with self._db(transaction=True) as conn:
+                    conn.executemany(
+                        "UPDATE cache_entries SET last_accessed = ?, "
+                        "access_count = access_count + ? WHERE key = ?",
+                        rows,
+                    )
+            except sqlite3.Error as e:
+                logging.debug(f"Failed to write cache access statistics: {e}")
+
+    def _record_hit(self, cache_key: str, start_ns: int) -> None:
+        """Count a cache hit and batch its access statistics."""
+        with self._lock:
+            _, hits = self._pending_hits.get(cache_key, (0.0, 0))
+            self._pending_hits[cache_key] = (time.time(), hits + 1)
+            if len(self._pending_hits) >= PENDING_HITS_LIMIT:
+                self._flush_hits()
+
+            self.stats.hit_count += 1
+            self._access_time_ns += time.monotonic_ns() - start_ns
+            self._access_count += 1
+
+        logging.info(f"Cache hit for {cache_key}")
+
+    def _remember(self, cache_key: str, payload: bytes) -> None:
+        """Keep a decompressed payload in the in-memory LRU."""
+        with self._lock:
+            self._mem_lru[cache_key] = payload
+            self._mem_lru.move_to_end(cache_key)
+            if len(self._mem_lru) > MEMORY_CACHE_SIZE:
+                self._mem_lru.popitem(last=False)
+
+    def _forget(self, cache_key: str) -> None:
+        """Drop pending statistics and the in-memory copy of an entry."""
+        with self._lock:
+            self._pending_hits.pop(cache_key, None)
+            self._mem_lru.pop(cache_key, None)
+
+    def _compact(self) -> None:
+        """Refresh planner statistics and release freed database pages."""
+        try:
+            with self._db() as conn:
+                conn.execute("ANALYZE")
+                # The pragma frees pages as its rows are stepped through
+                conn.execute("PRAGMA incremental_vacuum").fetchall()
+        except sqlite3.Error as e:
+            logging.debug(f"Cache database compaction failed: {e}")
+
+    def _writer_loop(self) -> None:
+        """Store queued color schemes until the process exits."""
+        while True:
+            args, kwargs = self._write_q.get()
+            try:
+                self.put(*args, **kwargs)
+            except Exception as e:
+                logging.warning(f"Background cache write failed: {e}")
+            finally:
+                self._write_q.task_done()
+
+    def queue_put(self, cache_key: str, data: Dict[str, Any], *args, **kwargs) -> None:
+        """Store a color scheme from a background thread.
+
+        Takes the same arguments as put(). The scheme is copied, so the
+        caller is free to modify it once this returns.
+        """
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._writer_loop, name="wal-cache-writer", daemon=True
+                )
+                self._writer.start()
+
+        self._write_q.put_nowait(((cache_key, copy.deepcopy(data), *args), kwargs))
+
+    def flush_writes(self) -> None:
+        """Wait until every queued write has been stored."""
+        self._write_q.join()
+
+    def close(self) -> None:
+        """Finish queued writes, then optimize and close the cache database."""
+        # Let a closed cache be garbage collected before interpreter exit
+        atexit.unregister(self.close)
+
+        # Not under the lock: the writer thread needs it to finish
+        self.flush_writes()
+
+        with self._lock:
+            if self._conn is None:
+                return
+
+            try:
+                self._flush_hits()
+                self._conn.execute("PRAGMA optimize")
+            except sqlite3.Error as e:
+                logging.debug(f"Cache database optimize failed: {e}")
+            finally:
+                self._conn.close()
+                self._conn = None
+
     def generate_cache_key(
         self, img_path: str, backend: str, light: bool, sat: str = ""
     ) -> str:
         """Generate a robust cache key for an image."""
+        return self._key_and_hash(img_path, backend, light, sat)[0]
+
+    def _key_and_hash(
+        self, img_path: str, backend: str, light: bool, sat: str = ""
+    ) -> Tuple[str, str]:
+        """Generate the cache key for an image along with its image hash."""
         try:
             # Get file stats for cache invalidation
             stat = os.stat(img_path)
@@ -118,7 +425,7 @@ class AdvancedCache:
             file_mtime = stat.st_mtime
 
             # Create image hash for deduplication
-            image_hash = self._get_image_hash(img_path)
+            image_hash = self._get_image_hash(img_path, stat=stat)
 
             # Combine all factors into cache key
             key_components = [
@@ -132,45 +439,106 @@ class AdvancedCache:
             ]
 
             cache_key = "_".join(key_components)
-            return hashlib.sha256(cache_key.encode()).hexdigest()[:16]
+            return _short_digest(cache_key.encode()), image_hash
 
         except OSError as e:
             logging.debug(f"Failed to generate cache key for {img_path}: {e}")
             # Fallback to simple key
-            return hashlib.md5(
-                f"{img_path}_{backend}_{light}_{sat}".encode(), usedforsecurity=False
-            ).hexdigest()[:16]
+            cache_key = f"{img_path}_{backend}_{light}_{sat}"
+            return _short_digest(cache_key.encode()), ""
 
-    def _get_image_hash(self, img_path: str, chunk_size: int = 8192) -> str:
+    def _get_image_hash(
+        self,
+        img_path: str,
+        chunk_size: int = 8192,
+        stat: Optional[os.stat_result] = None,
+    ) -> str:
         """Generate a hash of the image content for deduplication."""
         try:
-            hasher = hashlib.md5(usedforsecurity=False)
-            with open(img_path, "rb") as f:
-                # Hash first and last chunks for performance
-                chunk = f.read(chunk_size)
-                if chunk:
-                    hasher.update(chunk)
-
-                # Seek to end and read last chunk
-                f.seek(-min(chunk_size, f.tell()), 2)
-                chunk = f.read(chunk_size)
-                if chunk:
-                    hasher.update(chunk)
-
-            return hasher.hexdigest()[:12]
-        except OSError:
+            if stat is None:
+                stat = os.stat(img_path)
+
+            memo_key = (os.path.abspath(img_path), stat.st_size, stat.st_mtime_ns)
+            image_hash = self._hash_cache.get(memo_key)
+            if image_hash is not None:
+                return image_hash
+
+            hasher = _new_hasher()
+
+            # An empty file can't be mapped and has nothing to hash.
+            if stat.st_size:
+                with open(img_path, "rb") as f, mmap.mmap(
+                    f.fileno(), 0, access=mmap.ACCESS_READ
+                ) as mm:
+                    # Only the ends are read, so don't let the kernel
+                    # prefetch the rest of the file.
+                    if hasattr(mm, "madvise") and hasattr(mmap, "MADV_RANDOM"):
+                        mm.madvise(mmap.MADV_RANDOM)
+
+                    # Hash first and last chunks for performance
+                    hasher.update(mm[:chunk_size])
+                    hasher.update(mm[-chunk_size:])
+
+            image_hash = hasher.hexdigest()[:12]
+            self._hash_cache[memo_key] = image_hash
+            return image_hash
+        except (OSError, ValueError):
             return "unknown"
 
+    def _link_duplicate(self, payload_hash: str, cache_file: str) -> bool:
+        """Hard-link cache_file to a stored file holding the same payload.
+
+        Only files in the same format (same extension) are reused. Each key
+        keeps its own link, so removing one entry never affects another.
+        """
+        _, ext, compression = os.path.basename(cache_file).rpartition(".json")
+        suffix = ext + compression
+
+        try:
+            with self._db() as conn:
+                row = conn.execute(
+                    "SELECT file_path FROM cache_entries "
+                    "WHERE payload_hash = ? AND file_path LIKE ? LIMIT 1",
+                    (payload_hash, f"%{suffix}"),
+                ).fetchone()
+        except sqlite3.Error:
+            return False
+
+        if not row:
+            return False
+
+        # Link under a temporary name so an existing file is replaced in one
+        # step, and a stale source leaves it untouched.
+        tmp_file = _tmp_path(cache_file)
+        try:
+            os.link(row[0], tmp_file)
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            logging.debug(f"Failed to link duplicate cache file {row[0]}: {e}")
+            self._unlink_files((tmp_file,))
+            return False
+
+        return True
+
     def get(
         self, cache_key: str, img_path: str = "", backend: str = "unknown"
     ) -> Optional[Dict[str, Any]]:
         """Retrieve a cached color scheme."""
-        start_time = time.time()
+        start_ns = time.monotonic_ns()
+
+        # Repeat lookups are served from memory without touching SQLite
+        with self._lock:
+            payload = self._mem_lru.get(cache_key)
+            if payload is not None:
+                self._mem_lru.move_to_end(cache_key)
+                data = _loads(payload)
+                self._record_hit(cache_key, start_ns)
+                return data
 
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db() as conn:
                 cursor = conn.execute(
-                    "SELECT file_path, compressed, access_count FROM cache_entries WHERE key = ?",
+                    "SELECT file_path, compressed FROM cache_entries WHERE key = ?",
                     (cache_key,),
                 )
                 row = cursor.fetchone()
@@ -179,41 +547,35 @@ class AdvancedCache:
                     self.stats.miss_count += 1
                     return None
 
-                file_path, compressed, access_count = row
+                file_path, compressed = row
 
-                # Check if file exists
-                if not os.path.exists(file_path):
-                    self._remove_entry(cache_key)
-                    self.stats.miss_count += 1
-                    return None
-
-                # Load the cached data
+                # Load the cached data. A missing file surfaces as
+                # FileNotFoundError from open() rather than a separate stat.
                 try:
-                    if compressed:
-                        with gzip.open(file_path, "rt", encoding="utf-8") as f:
-                            data = json.load(f)
-                    else:
-                        with open(file_path, encoding="utf-8") as f:
-                            data = json.load(f)
-
-                    # Update access statistics
-                    current_time = time.time()
-                    conn.execute(
-                        "UPDATE cache_entries SET last_accessed = ?, access_count = ? WHERE key = ?",
-                        (current_time, access_count + 1, cache_key),
-                    )
-
-                    self.stats.hit_count += 1
-                    self.stats.avg_access_time = (
-                        self.stats.avg_access_time + (time.time() - start_time)
-                    ) / 2
-
-                    logging.info(f"Cache hit for {cache_key}")
+                    if file_path.endswith(".zst") and zstandard is None:
+                        raise OSError("zstandard is not installed")
+
+                    # Payloads are a few KB: read them whole and decode from
+                    # memory rather than through a streaming file object.
+                    with open(file_path, "rb") as f:
+                        payload = f.read()
+
+                    if file_path.endswith(".zst"):
+                        payload = zstandard.ZstdDecompressor().decompress(payload)
+                    elif compressed:
+                        payload = gzip.decompress(payload)
+
+                    data = _loads(payload)
+                    self._remember(cache_key, payload)
+                    self._record_hit(cache_key, start_ns)
                     return data
 
-                except (OSError, json.JSONDecodeError, gzip.BadGzipFile) as e:
-                    logging.warning(f"Failed to load cached data for {cache_key}: {e}")
-                    self._remove_entry(cache_key)
+                except (OSError, json.JSONDecodeError, *_DECOMPRESS_ERRORS) as e:
+                    if not isinstance(e, FileNotFoundError):
+                        logging.warning(
+                            f"Failed to load cached data for {cache_key}: {e}"
+                        )
+                    self._remove_entry(cache_key, file_path)
                     self.stats.miss_count += 1
                     return None
 
@@ -229,34 +591,59 @@ class AdvancedCache:
         img_path: str = "",
         backend: str = "unknown",
         compress: bool = True,
+        image_hash: Optional[str] = None,
     ) -> bool:
-        """Store a color scheme in the cache."""
+        """Store a color scheme in the cache.
+
+        image_hash may be passed when the caller already has it, otherwise
+        it is computed from img_path.
+        """
         try:
             # Generate file path
             cache_file = os.path.join(self.schemes_dir, f"{cache_key}.json")
             if compress:
-                cache_file += ".gz"
-
-            # Save the data
-            if compress:
-                with gzip.open(cache_file, "wt", encoding="utf-8") as f:
-                    json.dump(data, f, separators=(",", ":"))
-            else:
-                with open(cache_file, "w", encoding="utf-8") as f:
-                    json.dump(data, f, indent=2)
+                cache_file += ".zst" if zstandard is not None else ".gz"
+
+            payload = _dumps(data)
+            payload_hash = _short_digest(payload)
+
+            # Identical schemes share one file instead of being written again
+            linked = self._link_duplicate(payload_hash, cache_file)
+            if not linked:
+                # Save the data, compressed in memory and written in one go
+                if compress and zstandard is not None:
+                    blob = zstandard.ZstdCompressor(level=3).compress(payload)
+                elif compress:
+                    blob = gzip.compress(payload)
+                else:
+                    blob = payload
+
+                # Replace rather than write in place, so a file hard-linked
+                # to other keys by _link_duplicate keeps their payload.
+                tmp_file = _tmp_path(cache_file)
+                try:
+                    with open(tmp_file, "wb") as f:
+                        f.write(blob)
+                    os.replace(tmp_file, cache_file)
+                except OSError:
+                    self._unlink_files((tmp_file,))
+                    raise
 
             # Get file info
             stat = os.stat(cache_file)
             current_time = time.time()
-            image_hash = self._get_image_hash(img_path) if img_path else ""
+            if image_hash is None:
+                image_hash = self._get_image_hash(img_path) if img_path else ""
 
             # Store metadata in database
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db() as conn:
+                self._forget(cache_key)
                 conn.execute(
                     """INSERT OR REPLACE INTO cache_entries
                        (key, file_path, size, created_time, last_accessed,
-                        access_count, backend, image_hash, compressed)
-                       VALUES (?, ?, ?, ?, ?, 0, ?, ?, ?)""",
+                        access_count, backend, image_hash, compressed,
+                        payload_hash)
+                       VALUES (?, ?, ?, ?, ?, 0, ?, ?, ?, ?)""",
                     (
                         cache_key,
                         cache_file,
@@ -266,21 +653,27 @@ class AdvancedCache:
                         backend,
                         image_hash,
                         1 if compress else 0,
+                        payload_hash,
                     ),
                 )
 
             self.stats.total_entries += 1
             self.stats.total_size += stat.st_size
 
-            if compress:
-                # Estimate compression savings
-                uncompressed_size = len(json.dumps(data, indent=2))
-                self.stats.compression_saved += max(0, uncompressed_size - stat.st_size)
+            if compress and not linked:
+                # Compression savings against the payload actually written
+                self.stats.compression_saved += max(0, len(payload) - stat.st_size)
 
             logging.debug(f"Cached {cache_key} ({stat.st_size} bytes)")
             return True
 
-        except (OSError, sqlite3.Error, gzip.BadGzipFile, TypeError, ValueError) as e:
+        except (
+            OSError,
+            sqlite3.Error,
+            *_DECOMPRESS_ERRORS,
+            TypeError,
+            ValueError,
+        ) as e:
             logging.warning(f"Failed to cache {cache_key}: {e}")
             return False
 
@@ -297,7 +690,9 @@ class AdvancedCache:
         max_size_bytes = max_size_mb * 1024 * 1024
 
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            self._flush_hits()
+
+            with self._db(transaction=True) as conn:
                 # Get current cache statistics
                 cursor = conn.execute("SELECT SUM(size), COUNT(*) FROM cache_entries")
                 total_size, total_entries = cursor.fetchone()
@@ -307,48 +702,50 @@ class AdvancedCache:
                 if total_size <= max_size_bytes and total_entries < 1000:
                     return 0
 
-                # Get candidates for cleanup (exclude most accessed)
+                # Pick the entries to remove in one query: anything too old,
+                # plus the least recently used entries until the cache fits.
+                # freed_before is the size of every earlier candidate, all of
+                # which are removed while the cache is still too large.
                 cursor = conn.execute(
                     """
-                    SELECT key, file_path, size, created_time, last_accessed, access_count
-                    FROM cache_entries
-                    WHERE key NOT IN (
+                    WITH keep AS (
                         SELECT key FROM cache_entries
                         ORDER BY access_count DESC, last_accessed DESC
                         LIMIT ?
+                    ),
+                    candidates AS (
+                        SELECT key, file_path, size, last_accessed,
+                            SUM(size) OVER (
+                                ORDER BY last_accessed ASC, access_count ASC
+                                ROWS UNBOUNDED PRECEDING
+                            ) - size AS freed_before
+                        FROM cache_entries
+                        WHERE key NOT IN (SELECT key FROM keep)
                     )
-                    ORDER BY last_accessed ASC, access_count ASC
+                    SELECT key, file_path, size FROM candidates
+                    WHERE last_accessed < ? OR ? - freed_before > ?
                 """,
-                    (keep_most_accessed,),
+                    (
+                        keep_most_accessed,
+                        current_time - max_age_seconds,
+                        total_size,
+                        max_size_bytes,
+                    ),
                 )
 
-                candidates = cursor.fetchall()
-                size_freed = 0
-
-                for (
-                    key,
-                    file_path,
-                    size,
-                    _created_time,
-                    last_accessed,
-                    _access_count,
-                ) in candidates:
-                    should_remove = False
-
-                    # Remove if too old
-                    if current_time - last_accessed > max_age_seconds:
-                        should_remove = True
-                        logging.debug(f"Removing old cache entry: {key}")
-
-                    # Remove if cache is too large
-                    elif total_size - size_freed > max_size_bytes:
-                        should_remove = True
-                        logging.debug(f"Removing cache entry for size: {key}")
-
-                    if should_remove:
-                        if self._remove_entry(key, file_path):
-                            cleanup_count += 1
-                            size_freed += size
+                removed = cursor.fetchall()
+                conn.executemany(
+                    "DELETE FROM cache_entries WHERE key = ?",
+                    [(key,) for key, _, _ in removed],
+                )
+
+                for key, _, _ in removed:
+                    self._forget(key)
+
+                self._unlink_files(file_path for _, file_path, _ in removed)
+
+                cleanup_count = len(removed)
+                size_freed = sum(size for _, _, size in removed)
 
                 self.stats.cleanup_count += cleanup_count
                 logging.info(
@@ -358,12 +755,26 @@ class AdvancedCache:
         except sqlite3.Error as e:
             logging.warning(f"Cache cleanup failed: {e}")
 
+        if cleanup_count > COMPACT_THRESHOLD:
+            self._compact()
+
         return cleanup_count
 
+    @staticmethod
+    def _unlink_files(file_paths) -> None:
+        """Delete the scheme files of removed cache entries."""
+        for file_path in file_paths:
+            try:
+                os.unlink(file_path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logging.debug(f"Failed to remove cache file {file_path}: {e}")
+
     def _remove_entry(self, key: str, file_path: str = "") -> bool:
         """Remove a cache entry and its file."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db() as conn:
                 if not file_path:
                     cursor = conn.execute(
                         "SELECT file_path FROM cache_entries WHERE key = ?", (key,)
@@ -373,11 +784,12 @@ class AdvancedCache:
                         file_path = row[0]
 
                 # Remove from database
+                self._forget(key)
                 conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
 
                 # Remove file
-                if file_path and os.path.exists(file_path):
-                    os.unlink(file_path)
+                if file_path:
+                    self._unlink_files((file_path,))
 
                 return True
 
@@ -388,7 +800,9 @@ class AdvancedCache:
     def get_analytics(self) -> CacheStats:
         """Get detailed cache analytics."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            self._flush_hits()
+
+            with self._db() as conn:
                 # Update current stats
                 cursor = conn.execute(
                     "SELECT COUNT(*), SUM(size), AVG(access_count) FROM cache_entries"
@@ -413,6 +827,10 @@ class AdvancedCache:
         except (sqlite3.Error, Exception) as e:
             logging.warning(f"Failed to get cache analytics: {e}")
 
+        self.stats.avg_access_time = (
+            self._access_time_ns / max(1, self._access_count) / 1e9
+        )
+
         return self.stats
 
     def deduplicate(self) -> int:
@@ -420,33 +838,33 @@ class AdvancedCache:
         duplicates_removed = 0
 
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                # Find entries with same image hash but different keys
-                cursor = conn.execute("""
-                    SELECT image_hash, COUNT(*) as count
-                    FROM cache_entries
-                    WHERE image_hash != ''
-                    GROUP BY image_hash
-                    HAVING count > 1
-                """)
+            self._flush_hits()
 
-                for image_hash, _count in cursor.fetchall():
-                    # Keep the most recently accessed entry
-                    duplicate_cursor = conn.execute(
-                        """
-                        SELECT key, file_path, last_accessed
+            with self._db(transaction=True) as conn:
+                # Every entry sharing an image hash except the most recently
+                # accessed one
+                cursor = conn.execute("""
+                    SELECT key, file_path FROM (
+                        SELECT key, file_path, ROW_NUMBER() OVER (
+                            PARTITION BY image_hash ORDER BY last_accessed DESC
+                        ) AS rank
                         FROM cache_entries
-                        WHERE image_hash = ?
-                        ORDER BY last_accessed DESC
-                    """,
-                        (image_hash,),
+                        WHERE image_hash != ''
                     )
+                    WHERE rank > 1
+                """)
 
-                    entries = duplicate_cursor.fetchall()
-                    # Keep the first (most recent), remove the rest
-                    for key, file_path, _ in entries[1:]:
-                        if self._remove_entry(key, file_path):
-                            duplicates_removed += 1
+                duplicates = cursor.fetchall()
+                conn.executemany(
+                    "DELETE FROM cache_entries WHERE key = ?",
+                    [(key,) for key, _ in duplicates],
+                )
+
+                for key, _ in duplicates:
+                    self._forget(key)
+
+                self._unlink_files(file_path for _, file_path in duplicates)
+                duplicates_removed = len(duplicates)
 
                 logging.info(
                     f"Deduplication: removed {duplicates_removed} duplicate entries"
@@ -455,6 +873,9 @@ class AdvancedCache:
         except sqlite3.Error as e:
             logging.warning(f"Cache deduplication failed: {e}")
 
+        if duplicates_removed > COMPACT_THRESHOLD:
+            self._compact()
+
         return duplicates_removed
 
     def export_cache_info(self, output_file: str) -> bool:
@@ -497,12 +918,18 @@ class AdvancedCache:
                 util.create_dir(self.schemes_dir)
 
             # Clear database
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db(transaction=True) as conn:
+                self._pending_hits.clear()
+                self._mem_lru.clear()
                 conn.execute("DELETE FROM cache_entries")
                 conn.execute("DELETE FROM cache_stats")
 
+            self._compact()
+
             # Reset stats
             self.stats = CacheStats()
+            self._access_time_ns = 0
+            self._access_count = 0
 
             logging.info("Cache cleared successfully")
             return True
@@ -536,10 +963,15 @@ def cache_get(
 def cache_put(
     img_path: str, backend: str, light: bool, data: Dict[str, Any], sat: str = ""
 ) -> bool:
-    """Store color scheme in the advanced cache."""
+    """Store color scheme in the advanced cache.
+
+    The write happens in the background, so this only reports whether it
+    was queued. Cache writes never affect the current run.
+    """
     cache = get_cache()
-    cache_key = cache.generate_cache_key(img_path, backend, light, sat)
-    return cache.put(cache_key, data, img_path, backend)
+    cache_key, image_hash = cache._key_and_hash(img_path, backend, light, sat)
+    cache.queue_put(cache_key, data, img_path, backend, image_hash=image_hash)
+    return True
 
 
 def cache_cleanup_cli() -> int:
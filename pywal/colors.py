@@ -12,6 +12,9 @@ from typing import Any, Dict, List, Optional
 from . import cache, theme, util
 from .settings import CACHE_DIR, MODULE_DIR, __cache_version__
 
+# Path separators and dots in an image path, flattened in cache file names
+_CACHE_NAME_RE = re.compile("[/|\\|.]")
+
 
 def list_backends() -> List[str]:
     """List color backends."""
@@ -87,9 +90,10 @@ def generic_adjust(colors: List[str], light: bool) -> List[str]:
 def saturate_colors(colors: List[str], amount: Optional[str]) -> List[str]:
     """Saturate all colors."""
     if amount and float(amount) <= 1.0:
+        saturation = float(amount)
         for i, _ in enumerate(colors):
-            if i not in [0, 7, 8, 15]:
-                colors[i] = util.saturate_color(colors[i], float(amount))
+            if i not in (0, 7, 8, 15):
+                colors[i] = util.saturate_color(colors[i], saturation)
 
     return colors
 
@@ -99,7 +103,7 @@ def cache_fname(
 ) -> List[str]:
     """Create the cache file name."""
     color_type = "light" if light else "dark"
-    file_name = re.sub("[/|\\|.]", "_", img)
+    file_name = _CACHE_NAME_RE.sub("_", img)
     file_size = os.path.getsize(img)
 
     file_parts = [file_name, color_type, backend, sat, file_size, __cache_version__]
@@ -9,12 +9,122 @@ import json
 import logging
 import os
 import re
+import shutil
+import stat
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Set
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 from . import util
 from .settings import CACHE_DIR, CONF_DIR, __cache_version__, __version__
 
+try:
+    import orjson
+
+except ImportError:
+    orjson = None
+
+try:
+    import fcntl
+
+except ImportError:
+    fcntl = None
+
+# Paths under the config and cache directories, joined once.
+_TEMPLATES_DIR = os.path.join(CONF_DIR, "templates")
+_COLORSCHEMES_DIR = os.path.join(CONF_DIR, "colorschemes")
+_DARK_DIR = os.path.join(_COLORSCHEMES_DIR, "dark")
+_LIGHT_DIR = os.path.join(_COLORSCHEMES_DIR, "light")
+_THEMES_DIR = os.path.join(CONF_DIR, "themes")
+_VERSION_FILE = os.path.join(CONF_DIR, "version")
+_SCHEMES_CACHE_DIR = os.path.join(CACHE_DIR, "schemes")
+_OLD_CACHE_DIR = os.path.join(CACHE_DIR, "colorschemes")
+
+# Directories a working installation needs, parents before children.
+_REQUIRED_DIRS = (
+    CONF_DIR,
+    _TEMPLATES_DIR,
+    _COLORSCHEMES_DIR,
+    _DARK_DIR,
+    _LIGHT_DIR,
+    CACHE_DIR,
+    _SCHEMES_CACHE_DIR,
+)
+
+# Linux ioctl that makes a file share another's data copy-on-write.
+_FICLONE = 0x40049409
+
+# Pre-1.0 template variables: {color.background} is now {background}, etc.
+_OLD_TEMPLATE_VARIABLE_RE = re.compile(rb"\{color\.(background|foreground|cursor)\}")
+
+# Palette key names, interned like the literal special names so that
+# membership tests against them can short-circuit on identity.
+_COLOR_KEYS = tuple(sys.intern(f"color{i}") for i in range(16))
+
+_REQUIRED_SPECIAL = frozenset({"background", "foreground", "cursor"})
+_REQUIRED_COLORS = frozenset(_COLOR_KEYS)
+
+# Placeholder names a template may use, before any ".rgb" style modifier.
+_VALID_PLACEHOLDERS = frozenset({"wallpaper", "alpha"}).union(
+    _REQUIRED_SPECIAL, _COLOR_KEYS
+)
+
+# Template placeholders such as {color0} or {background.rgb} whose name is
+# not one of the above; known names are skipped by the lookahead.
+_UNKNOWN_PLACEHOLDER_RE = re.compile(
+    rf"\{{(?!(?:{'|'.join(sorted(_VALID_PLACEHOLDERS))})[.}}])([^}}]+)\}}"
+)
+
+_HEX_DIGITS = frozenset("0123456789abcdefABCDEF")
+
+_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp")
+
+
+def _clone_file(src: str, dst: str) -> str:
+    """Copy a file as a copy-on-write clone where the filesystem allows it.
+
+    Falls back to shutil.copy2(). Unlike a hard link, a clone is unaffected
+    when the original is later rewritten in place.
+    """
+    if fcntl is not None and sys.platform.startswith("linux"):
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+            shutil.copystat(src, dst)
+            return dst
+        except OSError:
+            pass
+
+    return shutil.copy2(src, dst)
+
+
+def _loads(data: bytes) -> Any:
+    """Deserialize JSON, with orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+
+    return json.loads(data)
+
+
+@lru_cache(maxsize=4096)
+def _is_hex_color(color: str) -> bool:
+    """Check a string is a 3 or 6 digit hex color, with or without '#'."""
+    color = color.lstrip("#")
+    return len(color) in (3, 6) and _HEX_DIGITS.issuperset(color)
+
+
+def _is_alpha_value(value: str) -> bool:
+    """Check an alpha value is 1 to 3 ASCII digits."""
+    return 0 < len(value) <= 3 and value.isascii() and value.isdigit()
+
+
+def _is_wallpaper_path(value: str) -> bool:
+    """Check a wallpaper is an image path or 'None'."""
+    value = value.lower()
+    return value == "none" or value.endswith(_IMAGE_EXTENSIONS)
+
 
 @dataclass
 class ConfigSchema:
@@ -23,9 +133,90 @@ class ConfigSchema:
     required_fields: Set[str] = field(default_factory=set)
     optional_fields: Set[str] = field(default_factory=set)
     field_types: Dict[str, type] = field(default_factory=dict)
-    field_patterns: Dict[str, str] = field(default_factory=dict)
+    field_patterns: Dict[str, re.Pattern] = field(default_factory=dict)
+    field_checks: Dict[str, Callable[[str], bool]] = field(default_factory=dict)
     field_ranges: Dict[str, tuple] = field(default_factory=dict)
 
+    # Validation specialized to this schema, see _build_validator
+    validate: Callable[[Dict[str, Any], str], List[str]] = field(
+        init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self):
+        """Build the validation function for this schema."""
+        self.validate = _build_validator(self)
+
+
+def _build_validator(
+    schema: ConfigSchema,
+) -> Callable[[Dict[str, Any], str], List[str]]:
+    """
+    Specialize validation to a schema.
+
+    The returned function takes the data and an error context suffix and
+    returns the errors found. Every check is bound here once, so each call
+    only walks the schema's own fields.
+    """
+    required = tuple(schema.required_fields)
+    checks = tuple(
+        (
+            name,
+            schema.field_types.get(name),
+            schema.field_patterns.get(name),
+            schema.field_checks.get(name),
+            schema.field_ranges.get(name),
+        )
+        for name in dict.fromkeys(
+            (
+                *schema.field_types,
+                *schema.field_patterns,
+                *schema.field_checks,
+                *schema.field_ranges,
+            )
+        )
+    )
+
+    def validate(data: Dict[str, Any], context: str) -> List[str]:
+        errors: List[str] = []
+
+        missing_required = {name for name in required if name not in data}
+        if missing_required:
+            errors.append(f"Missing required fields{context}: {missing_required}")
+
+        for field_name, expected_type, pattern, check, value_range in checks:
+            if field_name not in data:
+                continue
+            value = data[field_name]
+
+            if expected_type is not None and not isinstance(value, expected_type):
+                errors.append(
+                    f"Field '{field_name}'{context} must be {expected_type.__name__}, "
+                    f"got {type(value).__name__}"
+                )
+
+            if isinstance(value, str) and (
+                (pattern is not None and not pattern.match(value))
+                or (check is not None and not check(value))
+            ):
+                errors.append(
+                    f"Field '{field_name}'{context} does not match required pattern"
+                )
+
+            if value_range is not None:
+                min_val, max_val = value_range
+                try:
+                    if not min_val <= float(value) <= max_val:
+                        errors.append(
+                            f"Field '{field_name}'{context} must be between "
+                            f"{min_val} and {max_val}"
+                        )
+                except (ValueError, TypeError):
+                    errors.append(f"Field '{field_name}'{context} must be numeric")
+
+        return errors
+
+    return validate
+
 
 class ConfigValidator:
     """Validates nu-pywal configuration files and settings."""
@@ -44,9 +235,9 @@ class ConfigValidator:
             "author": str,
             "description": str,
         },
-        field_patterns={
-            "alpha": r"^\d{1,3}$",  # 0-999
-            "wallpaper": r"^.*\.(jpg|jpeg|png|gif|bmp|webp)$|^None$",
+        field_checks={
+            "alpha": _is_alpha_value,
+            "wallpaper": _is_wallpaper_path,
         },
         field_ranges={"alpha": (0, 100)},
     )
@@ -63,6 +254,12 @@ class ConfigValidator:
         self.errors: List[str] = []
         self.warnings: List[str] = []
 
+    def reset(self) -> None:
+        """Forget the errors and warnings of earlier validations."""
+        # Cleared in place, so the lists are reused across validations
+        self.errors.clear()
+        self.warnings.clear()
+
     def validate_color_scheme(
         self, scheme_data: Dict[str, Any], file_path: Optional[str] = None
     ) -> bool:
@@ -76,87 +273,105 @@ class ConfigValidator:
         Returns:
             True if valid, False otherwise
         """
-        self.errors.clear()
-        self.warnings.clear()
+        self.reset()
 
         return self._validate_against_schema(
             scheme_data, self.COLOR_SCHEME_SCHEMA, file_path
         )
 
+    def precheck_color_scheme(
+        self, raw: bytes, file_path: Optional[str] = None
+    ) -> bool:
+        """
+        Cheaply reject a serialized color scheme missing required fields.
+
+        A required key that doesn't appear anywhere in the raw JSON can't be
+        present once it is parsed, so such files fail without being decoded.
+
+        Args:
+            raw: The undecoded color scheme file contents
+            file_path: Optional file path for error reporting
+
+        Returns:
+            False if a required field is certainly missing, True otherwise
+        """
+        self.reset()
+
+        missing = {
+            name
+            for name in self.COLOR_SCHEME_SCHEMA.required_fields
+            if f'"{name}"'.encode() not in raw
+        }
+        if missing:
+            context = f" in {file_path}" if file_path else ""
+            self.errors.append(f"Missing required fields{context}: {missing}")
+
+        return not missing
+
     def validate_hex_color(self, color: str) -> bool:
         """Validate a hex color string."""
         if not isinstance(color, str):
             return False
 
-        # Remove # if present
-        color = color.lstrip("#")
-
-        # Check if it's a valid hex color (3 or 6 characters)
-        if len(color) not in [3, 6]:
-            return False
-
-        try:
-            int(color, 16)
-            return True
-        except ValueError:
-            return False
+        # Palettes repeat the same colors, so results are cached
+        return _is_hex_color(color)
 
     def validate_color_palette(self, colors: Dict[str, Any]) -> bool:
         """Validate a complete color palette."""
-        required_special = {"background", "foreground", "cursor"}
-        required_colors = {f"color{i}" for i in range(16)}
-
         # Check special colors
         if "special" not in colors:
             self.errors.append("Missing 'special' colors section")
             return False
 
+        # Collected locally and added to self.errors once
+        errors: List[str] = []
+
         special = colors["special"]
-        missing_special = required_special - set(special.keys())
+        # One C-level set operation
+        missing_special = _REQUIRED_SPECIAL.difference(special)
         if missing_special:
-            self.errors.append(f"Missing special colors: {missing_special}")
+            errors.append(f"Missing special colors: {sorted(missing_special)}")
 
         # Validate special color values
         for name, color in special.items():
             if not self.validate_hex_color(color):
-                self.errors.append(f"Invalid hex color for special.{name}: {color}")
+                errors.append(f"Invalid hex color for special.{name}: {color}")
 
         # Check color palette
-        if "colors" not in colors:
-            self.errors.append("Missing 'colors' section")
-            return False
-
-        color_palette = colors["colors"]
-        missing_colors = required_colors - set(color_palette.keys())
-        if missing_colors:
-            self.errors.append(f"Missing colors: {missing_colors}")
-
-        # Validate color values
-        for name, color in color_palette.items():
-            if not self.validate_hex_color(color):
-                self.errors.append(f"Invalid hex color for {name}: {color}")
+        if "colors" in colors:
+            color_palette = colors["colors"]
+            missing_colors = _REQUIRED_COLORS.difference(color_palette)
+            if missing_colors:
+                # Listed in palette order, so the message is stable
+                missing = [name for name in _COLOR_KEYS if name in missing_colors]
+                errors.append(f"Missing colors: {missing}")
+
+            # Validate color values
+            for name, color in color_palette.items():
+                if not self.validate_hex_color(color):
+                    errors.append(f"Invalid hex color for {name}: {color}")
+        else:
+            errors.append("Missing 'colors' section")
 
+        self.errors.extend(errors)
         return len(self.errors) == 0
 
     def validate_directory_structure(self) -> bool:
         """Validate the nu-pywal directory structure."""
-        self.errors.clear()
-        self.warnings.clear()
+        self.reset()
 
-        required_dirs = [
-            CONF_DIR,
-            os.path.join(CONF_DIR, "templates"),
-            os.path.join(CONF_DIR, "colorschemes"),
-            os.path.join(CONF_DIR, "colorschemes", "dark"),
-            os.path.join(CONF_DIR, "colorschemes", "light"),
-            CACHE_DIR,
-            os.path.join(CACHE_DIR, "schemes"),
-        ]
-
-        for directory in required_dirs:
-            if not os.path.exists(directory):
+        for directory in _REQUIRED_DIRS:
+            # One stat answers both existence and type
+            try:
+                st = os.stat(directory)
+            except FileNotFoundError:
                 self.warnings.append(f"Directory does not exist: {directory}")
-            elif not os.path.isdir(directory):
+                continue
+            except OSError as e:
+                self.errors.append(f"Cannot access directory {directory}: {e}")
+                continue
+
+            if not stat.S_ISDIR(st.st_mode):
                 self.errors.append(f"Path exists but is not a directory: {directory}")
             elif not os.access(directory, os.R_OK | os.W_OK):
                 self.errors.append(f"Directory not readable/writable: {directory}")
@@ -165,8 +380,7 @@ class ConfigValidator:
 
     def validate_template_file(self, template_path: str) -> bool:
         """Validate a template file."""
-        self.errors.clear()
-        self.warnings.clear()
+        self.reset()
 
         if not os.path.exists(template_path):
             self.errors.append(f"Template file does not exist: {template_path}")
@@ -176,23 +390,10 @@ class ConfigValidator:
             with open(template_path, encoding="utf-8") as f:
                 content = f.read()
 
-            # Check for basic template syntax
-            placeholders = re.findall(r"\{([^}]+)\}", content)
-            valid_placeholders = {
-                "wallpaper",
-                "alpha",
-                "background",
-                "foreground",
-                "cursor",
-            }
-            valid_placeholders.update(f"color{i}" for i in range(16))
-
-            invalid_placeholders = []
-            for placeholder in placeholders:
-                # Remove function calls (e.g., color0.strip, background.rgb)
-                base_placeholder = placeholder.split(".")[0]
-                if base_placeholder not in valid_placeholders:
-                    invalid_placeholders.append(placeholder)
+            # Check for basic template syntax. Known names, including ones
+            # with function calls (e.g. color0.strip, background.rgb), never
+            # match.
+            invalid_placeholders = _UNKNOWN_PLACEHOLDER_RE.findall(content)
 
             if invalid_placeholders:
                 self.warnings.append(
@@ -213,39 +414,7 @@ class ConfigValidator:
     ) -> bool:
         """Validate data against a schema."""
         context = f" in {file_path}" if file_path else ""
-
-        # Check required fields
-        missing_required = schema.required_fields - set(data.keys())
-        if missing_required:
-            self.errors.append(f"Missing required fields{context}: {missing_required}")
-
-        # Check field types
-        for field_name, expected_type in schema.field_types.items():
-            if field_name in data and not isinstance(data[field_name], expected_type):
-                self.errors.append(
-                    f"Field '{field_name}'{context} must be {expected_type.__name__}, "
-                    f"got {type(data[field_name]).__name__}"
-                )
-
-        # Check field patterns
-        for field_name, pattern in schema.field_patterns.items():
-            if field_name in data and isinstance(data[field_name], str):
-                if not re.match(pattern, data[field_name], re.IGNORECASE):
-                    self.errors.append(
-                        f"Field '{field_name}'{context} does not match required pattern"
-                    )
-
-        # Check field ranges
-        for field_name, (min_val, max_val) in schema.field_ranges.items():
-            if field_name in data:
-                try:
-                    value = float(data[field_name])
-                    if not min_val <= value <= max_val:
-                        self.errors.append(
-                            f"Field '{field_name}'{context} must be between {min_val} and {max_val}"
-                        )
-                except (ValueError, TypeError):
-                    self.errors.append(f"Field '{field_name}'{context} must be numeric")
+        self.errors.extend(schema.validate(data, context))
 
         return len(self.errors) == 0
 
@@ -277,13 +446,13 @@ class ConfigManager:
         # Validate directory structure
         if not self.validator.validate_directory_structure():
             logging.error("Directory structure validation failed:")
-            for error in self.validator.get_errors():
-                logging.error(f"  - {error}")
+            for error in self.validator.errors:
+                logging.error("  - %s", error)
             return False
 
         # Check for warnings
-        for warning in self.validator.get_warnings():
-            logging.warning(f"  - {warning}")
+        for warning in self.validator.warnings:
+            logging.warning("  - %s", warning)
 
         # Validate existing color schemes
         self._validate_color_schemes()
@@ -296,26 +465,53 @@ class ConfigManager:
 
     def validate_color_scheme_file(self, file_path: str) -> bool:
         """Validate a specific color scheme file."""
+        is_valid, records = self._check_color_scheme_file(file_path, self.validator)
+
+        for record in records:
+            logging.log(*record)
+
+        return is_valid
+
+    @staticmethod
+    def _check_color_scheme_file(
+        file_path: str, validator: ConfigValidator
+    ) -> Tuple[bool, List[Tuple[Any, ...]]]:
+        """
+        Validate a color scheme file without logging.
+
+        Returns:
+            Whether the file is valid, and the (level, msg, *args) records to log
+        """
+        records: List[Tuple[Any, ...]] = []
+
         try:
-            with open(file_path, encoding="utf-8") as f:
-                scheme_data = json.load(f)
+            with open(file_path, "rb") as f:
+                raw = f.read()
 
-            is_valid = self.validator.validate_color_scheme(scheme_data, file_path)
+            # Files missing a required key are rejected before being parsed
+            is_valid = validator.precheck_color_scheme(raw, file_path)
+            if is_valid:
+                scheme_data = _loads(raw)
+                is_valid = validator.validate_color_scheme(scheme_data, file_path)
 
             if not is_valid:
-                logging.error(f"Color scheme validation failed for {file_path}:")
-                for error in self.validator.get_errors():
-                    logging.error(f"  - {error}")
+                records.append(
+                    (logging.ERROR, "Color scheme validation failed for %s:", file_path)
+                )
+                for error in validator.errors:
+                    records.append((logging.ERROR, "  - %s", error))
 
             # Log warnings
-            for warning in self.validator.get_warnings():
-                logging.warning(f"  - {warning}")
+            for warning in validator.warnings:
+                records.append((logging.WARNING, "  - %s", warning))
 
-            return is_valid
+            return is_valid, records
 
-        except (OSError, json.JSONDecodeError) as e:
-            logging.error(f"Cannot read color scheme file {file_path}: {e}")
-            return False
+        except (OSError, json.JSONDecodeError, UnicodeDecodeError) as e:
+            records.append(
+                (logging.ERROR, "Cannot read color scheme file %s: %s", file_path, e)
+            )
+            return False, records
 
     def repair_installation(self) -> bool:
         """
@@ -326,57 +522,74 @@ class ConfigManager:
         """
         logging.info("Attempting to repair nu-pywal installation...")
 
-        # Create missing directories
-        required_dirs = [
-            CONF_DIR,
-            os.path.join(CONF_DIR, "templates"),
-            os.path.join(CONF_DIR, "colorschemes"),
-            os.path.join(CONF_DIR, "colorschemes", "dark"),
-            os.path.join(CONF_DIR, "colorschemes", "light"),
-            CACHE_DIR,
-            os.path.join(CACHE_DIR, "schemes"),
-        ]
-
-        for directory in required_dirs:
+        def create(directory: str) -> Optional[Exception]:
             try:
                 util.create_dir(directory)
-                logging.info(f"Created directory: {directory}")
             except Exception as e:
-                logging.error(f"Failed to create directory {directory}: {e}")
+                return e
+            return None
+
+        # Create missing directories concurrently, so slow filesystems don't
+        # serialize the mkdirs. makedirs(exist_ok=True) tolerates a parent
+        # being created by another thread. Results are logged in order.
+        with ThreadPoolExecutor(max_workers=min(8, len(_REQUIRED_DIRS))) as executor:
+            results = list(executor.map(create, _REQUIRED_DIRS))
+
+        for directory, error in zip(_REQUIRED_DIRS, results):
+            if error is not None:
+                logging.error("Failed to create directory %s: %s", directory, error)
                 return False
+            logging.info("Created directory: %s", directory)
 
         logging.info("Installation repair complete")
         return True
 
     def _validate_color_schemes(self):
         """Validate all color scheme files."""
-        scheme_dirs = [
-            os.path.join(CONF_DIR, "colorschemes", "dark"),
-            os.path.join(CONF_DIR, "colorschemes", "light"),
-        ]
+        scheme_dirs = [_DARK_DIR, _LIGHT_DIR]
 
+        scheme_files = []
         for scheme_dir in scheme_dirs:
-            if not os.path.exists(scheme_dir):
+            try:
+                entries = os.scandir(scheme_dir)
+            except FileNotFoundError:
                 continue
 
-            for file_entry in os.scandir(scheme_dir):
-                if file_entry.name.endswith(".json"):
-                    self.validate_color_scheme_file(file_entry.path)
+            with entries:
+                for file_entry in entries:
+                    # is_file() answers from the directory listing, no stat
+                    if file_entry.name.endswith(".json") and file_entry.is_file():
+                        scheme_files.append(file_entry.path)
+
+        if not scheme_files:
+            return
+
+        # Each file gets its own validator, since a validator keeps its
+        # errors on the instance. Records are logged here, in file order.
+        with ThreadPoolExecutor(max_workers=min(32, len(scheme_files))) as executor:
+            results = executor.map(
+                lambda path: self._check_color_scheme_file(path, ConfigValidator()),
+                scheme_files,
+            )
+            for _, records in results:
+                for record in records:
+                    logging.log(*record)
 
     def _validate_templates(self):
         """Validate all template files."""
-        template_dir = os.path.join(CONF_DIR, "templates")
-
-        if not os.path.exists(template_dir):
+        try:
+            entries = os.scandir(_TEMPLATES_DIR)
+        except FileNotFoundError:
             return
 
-        for file_entry in os.scandir(template_dir):
-            if file_entry.is_file():
-                self.validator.validate_template_file(file_entry.path)
+        with entries:
+            for file_entry in entries:
+                if file_entry.is_file():
+                    self.validator.validate_template_file(file_entry.path)
 
-                # Log any warnings
-                for warning in self.validator.get_warnings():
-                    logging.warning(f"Template {file_entry.name}: {warning}")
+                    # Log any warnings
+                    for warning in self.validator.warnings:
+                        logging.warning("Template %s: %s", file_entry.name, warning)
 
 
 def validate_config_cli() -> int:
@@ -431,17 +644,22 @@ class ConfigMigration:
 
     def __init__(self):
         """Initialize the configuration migration handler."""
-        self.version_file = os.path.join(CONF_DIR, "version")
+        self.version_file = _VERSION_FILE
+        # The version file's contents, once read; a 1-tuple since None is a
+        # valid version (no version file)
+        self._config_version: Optional[Tuple[Optional[str]]] = None
 
     def get_current_config_version(self) -> Optional[str]:
         """Get the current configuration version."""
-        try:
-            if os.path.exists(self.version_file):
+        if self._config_version is None:
+            try:
                 with open(self.version_file, encoding="utf-8") as f:
-                    return f.read().strip()
-        except OSError:
-            pass
-        return None
+                    version: Optional[str] = f.read().strip()
+            except OSError:
+                version = None
+            self._config_version = (version,)
+
+        return self._config_version[0]
 
     def set_config_version(self, version: str) -> bool:
         """Set the configuration version."""
@@ -449,9 +667,10 @@ class ConfigMigration:
             util.create_dir(os.path.dirname(self.version_file))
             with open(self.version_file, "w", encoding="utf-8") as f:
                 f.write(version)
+            self._config_version = (version,)
             return True
         except OSError as e:
-            logging.error(f"Failed to set config version: {e}")
+            logging.error("Failed to set config version: %s", e)
             return False
 
     def needs_migration(self) -> bool:
@@ -466,8 +685,8 @@ class ConfigMigration:
         """Migrate cache structure to new format."""
         try:
             # Old cache structure used different naming
-            old_cache_dir = os.path.join(CACHE_DIR, "colorschemes")
-            new_cache_dir = os.path.join(CACHE_DIR, "schemes")
+            old_cache_dir = _OLD_CACHE_DIR
+            new_cache_dir = _SCHEMES_CACHE_DIR
 
             if os.path.exists(old_cache_dir) and not os.path.exists(new_cache_dir):
                 logging.info("Migrating cache structure from old format...")
@@ -484,12 +703,16 @@ class ConfigMigration:
                         new_path = os.path.join(new_cache_dir, new_name)
 
                         try:
-                            os.rename(old_path, new_path)
+                            os.replace(old_path, new_path)
                             logging.info(
-                                f"Migrated cache file: {file_entry.name} -> {new_name}"
+                                "Migrated cache file: %s -> %s",
+                                file_entry.name,
+                                new_name,
                             )
                         except OSError as e:
-                            logging.warning(f"Failed to migrate {file_entry.name}: {e}")
+                            logging.warning(
+                                "Failed to migrate %s: %s", file_entry.name, e
+                            )
 
                 # Remove old cache directory if empty
                 try:
@@ -500,24 +723,18 @@ class ConfigMigration:
 
             return True
         except Exception as e:
-            logging.error(f"Cache migration failed: {e}")
+            logging.error("Cache migration failed: %s", e)
             return False
 
     def migrate_config_structure(self) -> bool:
         """Migrate configuration structure to new format."""
         try:
             # Ensure all required directories exist
-            required_dirs = [
-                os.path.join(CONF_DIR, "templates"),
-                os.path.join(CONF_DIR, "colorschemes", "dark"),
-                os.path.join(CONF_DIR, "colorschemes", "light"),
-            ]
-
-            for directory in required_dirs:
+            for directory in _REQUIRED_DIRS:
                 util.create_dir(directory)
 
             # Migrate old user themes to new structure
-            old_themes_dir = os.path.join(CONF_DIR, "themes")
+            old_themes_dir = _THEMES_DIR
             if os.path.exists(old_themes_dir):
                 logging.info("Migrating user themes to new structure...")
 
@@ -525,8 +742,8 @@ class ConfigMigration:
                     if file_entry.name.endswith(".json"):
                         # Try to determine if it's a light or dark theme
                         try:
-                            with open(file_entry.path, encoding="utf-8") as f:
-                                theme_data = json.load(f)
+                            with open(file_entry.path, "rb") as f:
+                                theme_data = _loads(f.read())
 
                             # Simple heuristic: check background brightness
                             bg_color = theme_data.get("special", {}).get(
@@ -534,23 +751,22 @@ class ConfigMigration:
                             )
                             # Convert hex to RGB and calculate brightness
                             hex_color = bg_color.lstrip("#")
-                            if len(hex_color) == 6:
-                                r, g, b = tuple(
-                                    int(hex_color[i : i + 2], 16) for i in (0, 2, 4)
-                                )
-                                brightness = (r * 0.299 + g * 0.587 + b * 0.114) / 255
+                            if len(hex_color) == 6 and _is_hex_color(hex_color):
+                                rgb = int(hex_color, 16)
+                                r, g, b = rgb >> 16, (rgb >> 8) & 0xFF, rgb & 0xFF
+                                # Luma scaled by 1000, compared against half of 255
+                                brightness = 299 * r + 587 * g + 114 * b
 
-                                target_dir = "light" if brightness > 0.5 else "dark"
+                                target_dir = "light" if brightness > 127500 else "dark"
                                 new_path = os.path.join(
-                                    CONF_DIR,
-                                    "colorschemes",
-                                    target_dir,
-                                    file_entry.name,
+                                    _COLORSCHEMES_DIR, target_dir, file_entry.name
                                 )
 
-                                os.rename(file_entry.path, new_path)
+                                os.replace(file_entry.path, new_path)
                                 logging.info(
-                                    f"Migrated theme {file_entry.name} to {target_dir}"
+                                    "Migrated theme %s to %s",
+                                    file_entry.name,
+                                    target_dir,
                                 )
                         except (
                             json.JSONDecodeError,
@@ -559,7 +775,7 @@ class ConfigMigration:
                             OSError,
                         ) as e:
                             logging.warning(
-                                f"Failed to migrate theme {file_entry.name}: {e}"
+                                "Failed to migrate theme %s: %s", file_entry.name, e
                             )
 
                 # Remove old themes directory if empty
@@ -571,51 +787,75 @@ class ConfigMigration:
 
             return True
         except Exception as e:
-            logging.error(f"Config migration failed: {e}")
+            logging.error("Config migration failed: %s", e)
             return False
 
     def migrate_template_variables(self) -> bool:
         """Migrate template files to use new variable names."""
         try:
-            template_dir = os.path.join(CONF_DIR, "templates")
-            if not os.path.exists(template_dir):
+            if not os.path.exists(_TEMPLATES_DIR):
                 return True
 
-            # Variable name mappings: old_name -> new_name
-            variable_mappings = {
-                "{color.background}": "{background}",
-                "{color.foreground}": "{foreground}",
-                "{color.cursor}": "{cursor}",
-            }
-
-            for file_entry in os.scandir(template_dir):
-                if file_entry.is_file():
-                    try:
-                        with open(file_entry.path, encoding="utf-8") as f:
-                            content = f.read()
-
-                        original_content = content
-                        for old_var, new_var in variable_mappings.items():
-                            content = content.replace(old_var, new_var)
-
-                        # Only write if content changed
-                        if content != original_content:
-                            with open(file_entry.path, "w", encoding="utf-8") as f:
-                                f.write(content)
-                            logging.info(
-                                f"Updated template variables in {file_entry.name}"
-                            )
+            template_files = [
+                file_entry
+                for file_entry in os.scandir(_TEMPLATES_DIR)
+                if file_entry.is_file()
+            ]
+            if not template_files:
+                return True
 
-                    except (OSError, UnicodeDecodeError) as e:
-                        logging.warning(
-                            f"Failed to update template {file_entry.name}: {e}"
-                        )
+            # Templates are read and rewritten concurrently, so their I/O
+            # overlaps. Records are logged here, in file order.
+            with ThreadPoolExecutor(
+                max_workers=min(32, len(template_files))
+            ) as executor:
+                for records in executor.map(
+                    self._migrate_template_file, template_files
+                ):
+                    for record in records:
+                        logging.log(*record)
 
             return True
         except Exception as e:
-            logging.error(f"Template migration failed: {e}")
+            logging.error("Template migration failed: %s", e)
             return False
 
+    @staticmethod
+    def _migrate_template_file(file_entry: os.DirEntry) -> List[Tuple[Any, ...]]:
+        """
+        Rename old variables in one template file without logging.
+
+        Returns:
+            The (level, msg, *args) records to log
+        """
+        try:
+            with open(file_entry.path, "rb") as f:
+                content = f.read()
+
+            # All old variables are renamed in one pass over the raw bytes,
+            # so unchanged files are never decoded
+            content, count = _OLD_TEMPLATE_VARIABLE_RE.subn(rb"{\1}", content)
+
+            # Only write if content changed
+            if count:
+                with open(file_entry.path, "wb") as f:
+                    f.write(content)
+                return [
+                    (logging.INFO, "Updated template variables in %s", file_entry.name)
+                ]
+
+        except OSError as e:
+            return [
+                (
+                    logging.WARNING,
+                    "Failed to update template %s: %s",
+                    file_entry.name,
+                    e,
+                )
+            ]
+
+        return []
+
     def run_migration(self) -> bool:
         """Run all necessary migrations."""
         if not self.needs_migration():
@@ -624,7 +864,9 @@ class ConfigMigration:
 
         current_version = self.get_current_config_version()
         logging.info(
-            f"Migrating configuration from {current_version or 'unknown'} to {__version__}"
+            "Migrating configuration from %s to %s",
+            current_version or "unknown",
+            __version__,
         )
 
         migration_steps = [
@@ -634,9 +876,9 @@ class ConfigMigration:
         ]
 
         for step_name, migration_func in migration_steps:
-            logging.info(f"Running migration: {step_name}")
+            logging.info("Running migration: %s", step_name)
             if not migration_func():
-                logging.error(f"Migration step '{step_name}' failed")
+                logging.error("Migration step '%s' failed", step_name)
                 return False
 
         # Update version file
@@ -651,7 +893,6 @@ class ConfigMigration:
         """Create a backup of the current configuration."""
         try:
             import datetime
-            import shutil
 
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
             backup_dir = os.path.join(CONF_DIR, f"backup_{timestamp}")
@@ -661,23 +902,26 @@ class ConfigMigration:
                 util.create_dir(backup_dir)
 
                 # Copy all config files
-                for item in os.listdir(CONF_DIR):
-                    if item.startswith("backup_"):
+                for file_entry in os.scandir(CONF_DIR):
+                    if file_entry.name.startswith("backup_"):
                         continue  # Skip existing backups
 
-                    src_path = os.path.join(CONF_DIR, item)
-                    dst_path = os.path.join(backup_dir, item)
+                    dst_path = os.path.join(backup_dir, file_entry.name)
 
-                    if os.path.isdir(src_path):
-                        shutil.copytree(src_path, dst_path)
+                    # Clone rather than copy file data where possible.
+                    # is_dir() answers from the directory listing, no stat
+                    if file_entry.is_dir():
+                        shutil.copytree(
+                            file_entry.path, dst_path, copy_function=_clone_file
+                        )
                     else:
-                        shutil.copy2(src_path, dst_path)
+                        _clone_file(file_entry.path, dst_path)
 
-                logging.info(f"Configuration backup created: {backup_dir}")
+                logging.info("Configuration backup created: %s", backup_dir)
                 return backup_dir
 
         except Exception as e:
-            logging.error(f"Failed to create configuration backup: {e}")
+            logging.error("Failed to create configuration backup: %s", e)
 
         return None
 
@@ -701,7 +945,7 @@ def migrate_config_cli() -> int:
     # Create backup before migration
     backup_dir = migration.backup_config()
     if backup_dir:
-        logging.info(f"Backup created at: {backup_dir}")
+        logging.info("Backup created at: %s", backup_dir)
     else:
         logging.warning("Failed to create backup. Continue migration? (y/N): ")
         if input().lower() != "y":
@@ -717,5 +961,5 @@ def migrate_config_cli() -> int:
     else:
         logging.error("Configuration migration failed.")
         if backup_dir:
-            logging.info(f"You can restore from backup: {backup_dir}")
+            logging.info("You can restore from backup: %s", backup_dir)
         return 1
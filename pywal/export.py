@@ -10,6 +10,12 @@ from typing import Any, Dict, Optional
 from . import util
 from .settings import CACHE_DIR, CONF_DIR, MODULE_DIR
 
+# A single-braced placeholder such as {color0.lighten(0.5)}, not {{escaped}}
+_PLACEHOLDER_RE = re.compile(r"(?<=(?<!\{))(\{([^{}]+)\})(?=(?!\}))")
+
+# Splits a placeholder's modifier chain into its calls and attributes
+_MODIFIER_SPLIT_RE = re.compile(r"\)|\.")
+
 
 def template(
     colors: Dict[str, Any], input_file: str, output_file: Optional[str] = None
@@ -19,7 +25,7 @@ def template(
     # pylint: disable-msg=too-many-locals
     template_data = util.read_file_raw(input_file)
     for i, line in enumerate(template_data):
-        for match in re.finditer(r"(?<=(?<!\{))(\{([^{}]+)\})(?=(?!\}))", line):
+        for match in _PLACEHOLDER_RE.finditer(line):
             # Get the color, and the functions associated with it
             cname, _, funcs = match.group(2).partition(".")
             # Check that functions are needed for this color
@@ -30,7 +36,7 @@ def template(
             # Color to be modified copied into new one
             new_color = util.Color(colors[cname].hex_color)
             # Execute each function to be done
-            for func in filter(None, re.split(r"\)|\.", funcs)):
+            for func in filter(None, _MODIFIER_SPLIT_RE.split(funcs)):
                 # Get function name and arguments
                 func = func.split("(")
                 fname = func[0]
@@ -6,6 +6,7 @@ import logging
 import os
 import random
 import re
+import stat
 import sys
 from typing import List, Tuple
 
@@ -21,12 +22,28 @@ def get_image_dir_recursive(img_dir: str) -> Tuple[List[str], str]:
     file_types = (".png", ".jpg", ".jpeg", ".jpe", ".gif")
 
     images = []
-    for path, _, files in os.walk(img_dir):
-        for name in files:
-            if name.lower().endswith(file_types):
-                if name.endswith(current_wall):
-                    current_wall = os.path.join(path, name)
-                images.append(os.path.join(path, name))
+    dirs = [img_dir]
+    while dirs:
+        subdirs = []
+        try:
+            with os.scandir(dirs.pop()) as entries:
+                for entry in entries:
+                    # Like os.walk, don't descend into symlinked directories
+                    if entry.is_dir():
+                        if not entry.is_symlink():
+                            subdirs.append(entry.path)
+                        continue
+
+                    name = entry.name
+                    if name.lower().endswith(file_types):
+                        if name.endswith(current_wall):
+                            current_wall = entry.path
+                        images.append(entry.path)
+        except OSError:
+            continue
+
+        # Visit subdirectories in listing order, as os.walk does
+        dirs.extend(reversed(subdirs))
 
     return images, current_wall
 
@@ -43,6 +60,41 @@ def get_image_dir(img_dir: str) -> Tuple[List[str], str]:
     ], current_wall
 
 
+def reservoir_sample_dir(
+    img_dir: str, k: int = 20, recursive: bool = False
+) -> List[str]:
+    """Pick up to k random image paths from a directory without listing it."""
+    file_types = (".png", ".jpg", ".jpeg", ".jpe", ".gif")
+
+    reservoir: List[str] = []
+    seen = 0
+    dirs = [img_dir]
+    while dirs:
+        try:
+            with os.scandir(dirs.pop()) as entries:
+                for entry in entries:
+                    if recursive and entry.is_dir(follow_symlinks=False):
+                        dirs.append(entry.path)
+                        continue
+
+                    if not entry.name.lower().endswith(file_types):
+                        continue
+
+                    # Algorithm R: keep the image with probability
+                    # k / (seen + 1), where seen images came before it
+                    if seen < k:
+                        reservoir.append(entry.path)
+                    else:
+                        index = random.randrange(seen + 1)  # noqa: S311
+                        if index < k:
+                            reservoir[index] = entry.path
+                    seen += 1
+        except OSError:
+            continue
+
+    return reservoir
+
+
 def get_random_image(img_dir: str, recursive: bool) -> str:
     """Pick a random image file from a directory."""
     if recursive:
@@ -96,10 +148,16 @@ def get(
     recursive: bool = False,
 ) -> str:
     """Validate image input."""
-    if os.path.isfile(img):
+    # One stat() answers both "file?" and "directory?".
+    try:
+        mode = os.stat(img).st_mode
+    except (OSError, ValueError):
+        mode = 0
+
+    if stat.S_ISREG(mode):
         wal_img = img
 
-    elif os.path.isdir(img):
+    elif stat.S_ISDIR(mode):
         if iterative:
             wal_img = get_next_image(img, recursive)
 
@@ -6,28 +6,188 @@ and color generation to improve performance on multi-core systems.
 """
 
 import concurrent.futures
+import hashlib
+import heapq
 import logging
+import multiprocessing.util
 import os
+import shutil
 import sys
+import tempfile
 import time
-from collections import defaultdict
-from typing import Any, Dict, List, Optional, Tuple, Union
-
-from . import colors, image, util
+import weakref
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from operator import itemgetter
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional, Tuple, Union
+
+from . import cache, colors, image, util
 from .settings import CACHE_DIR
 
+try:
+    from PIL import Image
+
+except ImportError:
+    Image = None
+
+
+# Linear light for each 8-bit sRGB channel value, as used by the WCAG
+# relative luminance formula.
+_SRGB_TO_LINEAR = tuple(
+    c / 12.92 if c <= 0.03928 else ((c + 0.055) / 1.055) ** 2.4
+    for c in (i / 255.0 for i in range(256))
+)
+
+
+def _relative_luminance(color: str) -> float:
+    """Get the WCAG relative luminance of a hex color, 0.5 if not 6 digits."""
+    hex_color = color.lstrip("#")
+    if len(hex_color) != 6:
+        return 0.5
+    r, g, b = bytes.fromhex(hex_color)
+    return (
+        0.2126 * _SRGB_TO_LINEAR[r]
+        + 0.7152 * _SRGB_TO_LINEAR[g]
+        + 0.0722 * _SRGB_TO_LINEAR[b]
+    )
+
+
+# Scores of recently ranked palettes, keyed by their colors
+SCORE_CACHE_SIZE = 512
+_score_cache: "OrderedDict[Tuple[Any, ...], float]" = OrderedDict()
+
+
+def _init_worker(backends: Tuple[str, ...] = ()) -> None:
+    """Prepare a worker process for color generation."""
+    # A forked worker must not share the parent's SQLite connection or
+    # writer thread, so it opens its own cache on first use.
+    cache._cache_instance = None
+
+    # Forked workers exit without running atexit handlers, so the cache's
+    # queued writes are flushed by a finalizer when the worker shuts down
+    multiprocessing.util.Finalize(None, _flush_cache_writes, exitpriority=10)
+
+    # Import backends up front so the first timed run doesn't pay for it
+    for backend in backends:
+        try:
+            __import__(f"pywal.backends.{backend}")
+        except ImportError:
+            continue
+
+
+def _flush_cache_writes() -> None:
+    """Finish this process's queued cache writes."""
+    if cache._cache_instance is not None:
+        cache._cache_instance.flush_writes()
+
+
+@lru_cache(maxsize=128)
+def _load_scheme_cached(cache_file: str, mtime: int) -> Dict[str, Any]:
+    """Parse a cached scheme file, once per modification time."""
+    return colors.file(cache_file)
+
+
+def _load_scheme(cache_file: str) -> Dict[str, Any]:
+    """Load a cached scheme, reusing the parsed file while it is unchanged."""
+    try:
+        mtime = os.stat(cache_file).st_mtime_ns
+    except OSError:
+        return colors.file(cache_file)
+
+    # Copy the nested dicts so callers can't change the cached scheme
+    scheme = _load_scheme_cached(cache_file, mtime)
+    return {
+        key: dict(value) if isinstance(value, dict) else value
+        for key, value in scheme.items()
+    }
+
+
+def _list_cached_schemes() -> FrozenSet[str]:
+    """List the file names in the scheme cache directory."""
+    try:
+        return frozenset(os.listdir(os.path.join(CACHE_DIR, "schemes")))
+    except OSError:
+        return frozenset()
+
+
+def _process_image(
+    img_path: str,
+    light: bool,
+    backends: List[str],
+    sat: str,
+    cached_schemes: Optional[FrozenSet[str]] = None,
+) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Generate colors for a single image with fallback backends.
+
+    This is a module-level function so worker processes can run it.
+
+    Args:
+        cached_schemes: Names in the scheme cache directory, listed once per
+            batch. If None, each cache file is checked on disk instead
+
+    Returns:
+        The color scheme (None if every backend failed) and the statistics
+        to add to the processor's totals
+    """
+    stats: Dict[str, Any] = {
+        "cache_hits": 0,
+        "cache_misses": 0,
+        "backend_attempts": [],
+        "backend_successes": [],
+    }
+
+    for backend in backends:
+        try:
+            stats["backend_attempts"].append(backend)
+
+            # Check cache first
+            cache_name = colors.cache_fname(img_path, backend, light, CACHE_DIR, sat)
+            cache_file = os.path.join(*cache_name)
+
+            if (
+                cache_name[-1] in cached_schemes
+                if cached_schemes is not None
+                else os.path.isfile(cache_file)
+            ):
+                stats["cache_hits"] += 1
+                return _load_scheme(cache_file), stats
+
+            # Generate new colors
+            stats["cache_misses"] += 1
+            result = colors.get(img_path, light, backend, CACHE_DIR, sat)
+            stats["backend_successes"].append(backend)
+
+            return result, stats
+
+        except Exception as e:
+            logging.debug(f"Backend {backend} failed for {img_path}: {e}")
+            continue
+
+    return None, stats
+
 
 class ParallelColorProcessor:
     """Handles parallel color generation from images."""
 
-    def __init__(self, max_workers: Optional[int] = None):
+    def __init__(self, max_workers: Optional[int] = None, use_processes: bool = True):
         """
         Initialize the parallel color processor.
 
         Args:
-            max_workers: Maximum number of worker threads. If None, uses the number of CPUs
+            max_workers: Maximum number of workers. If None, uses the number of
+                CPUs for processes, or up to 4 threads
+            use_processes: Generate colors in worker processes, so CPU-bound
+                backends are not serialized by the GIL. Threads are lighter
+                when backends mostly wait on subprocesses such as ImageMagick
         """
-        self.max_workers = max_workers or min(4, (os.cpu_count() or 1) + 1)
+        self.use_processes = use_processes
+        if use_processes:
+            self.max_workers = max_workers or os.cpu_count() or 1
+        else:
+            self.max_workers = max_workers or min(4, (os.cpu_count() or 1) + 1)
         self.stats = {
             "images_processed": 0,
             "cache_hits": 0,
@@ -56,70 +216,134 @@ class ParallelColorProcessor:
         Returns:
             Dictionary mapping image paths to their color schemes
         """
+        return dict(self.iter_image_batch(image_paths, light, backends, sat))
+
+    def iter_image_batch(
+        self,
+        image_paths: List[str],
+        light: bool = False,
+        backends: Optional[List[str]] = None,
+        sat: str = "",
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Process multiple images in parallel, yielding each result as it completes.
+
+        Images that haven't started yet are cancelled when the caller stops
+        iterating early.
+
+        Args:
+            image_paths: List of image file paths to process
+            light: Whether to generate light color schemes
+            backends: List of backends to try (None for default)
+            sat: Saturation adjustment
+
+        Yields:
+            Tuples of (image_path, color_scheme) in completion order
+        """
         if not backends:
             backends = colors.list_backends()[:3]  # Use top 3 backends
 
-        start_time = time.time()
-        results = {}
+        if not image_paths:
+            return
+
+        start_time = time.perf_counter()
+
+        if len(image_paths) == 1:
+            # Starting a pool costs more than it saves for a single image,
+            # and a few isfile() checks cost less than listing the cache
+            img_path = image_paths[0]
+            try:
+                result = self._record_result(
+                    img_path, _process_image(img_path, light, backends, sat)
+                )
+            except Exception as e:
+                logging.error(f"Error processing {img_path}: {e}")
+                result = None
+            finally:
+                self.stats["total_time"] += time.perf_counter() - start_time
+
+            if result:
+                yield img_path, result
+            return
+
+        # One listing answers every image's cache lookup. Each image appears
+        # once per batch, so schemes written meanwhile never need re-listing.
+        cached_schemes = _list_cached_schemes()
+
+        # Process pools start every worker up front, so don't ask for more
+        # than there are images. Workers import the backends as they start
+        # rather than inside the first image they are given.
+        if self.use_processes:
+            executor = ProcessPoolExecutor(
+                max_workers=min(self.max_workers, len(image_paths)),
+                initializer=_init_worker,
+                initargs=(tuple(backends),),
+            )
+        else:
+            executor = ThreadPoolExecutor(max_workers=self.max_workers)
 
-        with concurrent.futures.ThreadPoolExecutor(
-            max_workers=self.max_workers
-        ) as executor:
+        with executor:
             # Submit all tasks
             future_to_image = {
                 executor.submit(
-                    self._process_single_image, img_path, light, backends, sat
+                    _process_image, img_path, light, backends, sat, cached_schemes
                 ): img_path
                 for img_path in image_paths
             }
 
-            # Collect results as they complete
-            for future in concurrent.futures.as_completed(future_to_image):
-                img_path = future_to_image[future]
-                try:
-                    result = future.result()
+            try:
+                # Collect results as they complete
+                for future in concurrent.futures.as_completed(future_to_image):
+                    img_path = future_to_image[future]
+                    try:
+                        outcome = future.result()
+                    except Exception as e:
+                        logging.error(f"Error processing {img_path}: {e}")
+                        continue
+
+                    result = self._record_result(img_path, outcome)
                     if result:
-                        results[img_path] = result
-                        self.stats["images_processed"] += 1
-                        logging.info(f"Processed {img_path}")
-                    else:
-                        logging.warning(f"Failed to process {img_path}")
-                except Exception as e:
-                    logging.error(f"Error processing {img_path}: {e}")
+                        yield img_path, result
+            finally:
+                for future in future_to_image:
+                    future.cancel()
 
-        self.stats["total_time"] += time.time() - start_time
-        return results
+                self.stats["total_time"] += time.perf_counter() - start_time
 
     def _process_single_image(
         self, img_path: str, light: bool, backends: List[str], sat: str
     ) -> Optional[Dict[str, Any]]:
-        """Process a single image with fallback backends."""
-        for backend in backends:
-            try:
-                self.stats["backend_attempts"][backend] += 1
+        """Process a single image with fallback backends in this thread."""
+        result, stats = _process_image(img_path, light, backends, sat)
+        self._merge_stats(stats)
+        return result
 
-                # Check cache first
-                cache_name = colors.cache_fname(
-                    img_path, backend, light, CACHE_DIR, sat
-                )
-                cache_file = os.path.join(*cache_name)
-
-                if os.path.isfile(cache_file):
-                    self.stats["cache_hits"] += 1
-                    return colors.file(cache_file)
-
-                # Generate new colors
-                self.stats["cache_misses"] += 1
-                result = colors.get(img_path, light, backend, CACHE_DIR, sat)
-                self.stats["backend_successes"][backend] += 1
-                return result
+    def _record_result(
+        self,
+        img_path: str,
+        outcome: Tuple[Optional[Dict[str, Any]], Dict[str, Any]],
+    ) -> Optional[Dict[str, Any]]:
+        """Count an image's outcome and return its color scheme, if any."""
+        result, stats = outcome
+        self._merge_stats(stats)
 
-            except Exception as e:
-                logging.debug(f"Backend {backend} failed for {img_path}: {e}")
-                continue
+        if result:
+            self.stats["images_processed"] += 1
+            logging.info(f"Processed {img_path}")
+            return result
 
+        logging.warning(f"Failed to process {img_path}")
         return None
 
+    def _merge_stats(self, stats: Dict[str, Any]) -> None:
+        """Add the statistics from processing one image to the totals."""
+        self.stats["cache_hits"] += stats["cache_hits"]
+        self.stats["cache_misses"] += stats["cache_misses"]
+        for backend in stats["backend_attempts"]:
+            self.stats["backend_attempts"][backend] += 1
+        for backend in stats["backend_successes"]:
+            self.stats["backend_successes"][backend] += 1
+
     def find_best_images(
         self,
         img_dir: str,
@@ -139,60 +363,57 @@ class ParallelColorProcessor:
         Returns:
             List of tuples (image_path, color_scheme) for the best images
         """
-        if recursive:
-            images, _ = image.get_image_dir_recursive(img_dir)
-        else:
-            images, _ = image.get_image_dir(img_dir)
-            images = [os.path.join(img_dir, img) for img in images]
+        # Limit the number of images to process for performance, sampling
+        # while walking the directory instead of listing it all first
+        images = image.reservoir_sample_dir(img_dir, 20, recursive)
 
         if not images:
             return []
 
-        # Limit the number of images to process for performance
-        if len(images) > 20:
-            import random
-
-            images = random.sample(images, 20)
-
         # Process images in parallel
         results = self.process_image_batch(images, backends=backends)
 
         # Score images based on color diversity and quality
-        scored_images = []
-        for img_path, color_scheme in results.items():
-            if color_scheme:
-                score = self._calculate_image_score(color_scheme)
-                scored_images.append((score, img_path, color_scheme))
+        scored_images = (
+            (self._calculate_image_score(color_scheme), img_path, color_scheme)
+            for img_path, color_scheme in results.items()
+            if color_scheme
+        )
 
-        # Sort by score and return top results
-        scored_images.sort(reverse=True)
-        return [(img, scheme) for _, img, scheme in scored_images[:count]]
+        # Keep only the top results instead of sorting every image
+        best = heapq.nlargest(count, scored_images, key=itemgetter(0, 1))
+        return [(img, scheme) for _, img, scheme in best]
 
     def _calculate_image_score(self, color_scheme: Dict[str, Any]) -> float:
         """Calculate a quality score for a color scheme."""
         try:
             colors_dict = color_scheme.get("colors", {})
             special = color_scheme.get("special", {})
+            bg = special.get("background", "#000000")
+            fg = special.get("foreground", "#ffffff")
+
+            # The score only depends on these, in palette order
+            key = (tuple(colors_dict.items()), bg, fg)
+            if key in _score_cache:
+                _score_cache.move_to_end(key)
+                return _score_cache[key]
 
             # Basic score components
             score = 0.0
 
             # Color diversity - check how different the colors are
-            color_values = list(colors_dict.values())
-            if len(color_values) >= 16:
-                unique_colors = len(set(color_values))
+            if len(colors_dict) >= 16:
+                unique_colors = len(set(colors_dict.values()))
                 score += (unique_colors / 16.0) * 0.3
 
             # Contrast between background and foreground
-            bg = special.get("background", "#000000")
-            fg = special.get("foreground", "#ffffff")
             if bg and fg:
                 contrast_score = self._calculate_contrast(bg, fg)
                 score += contrast_score * 0.4
 
             # Color saturation diversity
             saturations = []
-            for color in color_values[:8]:  # Primary colors
+            for color in islice(colors_dict.values(), 8):  # Primary colors
                 if color and color.startswith("#"):
                     sat = self._calculate_saturation(color)
                     saturations.append(sat)
@@ -201,31 +422,27 @@ class ParallelColorProcessor:
                 sat_variance = self._calculate_variance(saturations)
                 score += min(sat_variance, 1.0) * 0.3
 
+            _score_cache[key] = score
+            if len(_score_cache) > SCORE_CACHE_SIZE:
+                _score_cache.popitem(last=False)
+
             return score
 
         except Exception as e:
             logging.debug(f"Error calculating image score: {e}")
             return 0.0
 
-    def _calculate_contrast(self, color1: str, color2: str) -> float:
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _calculate_contrast(color1: str, color2: str) -> float:
         """Calculate contrast ratio between two colors."""
         try:
+            # A color against itself is always the minimum 1:1 ratio
+            if color1 == color2:
+                return 1 / 21.0
 
-            def get_luminance(color):
-                # Remove # and convert to RGB
-                hex_color = color.lstrip("#")
-                if len(hex_color) != 6:
-                    return 0.5
-                r, g, b = tuple(int(hex_color[i : i + 2], 16) for i in (0, 2, 4))
-                # Convert to relative luminance
-                r, g, b = (x / 255.0 for x in (r, g, b))
-                r = r / 12.92 if r <= 0.03928 else ((r + 0.055) / 1.055) ** 2.4
-                g = g / 12.92 if g <= 0.03928 else ((g + 0.055) / 1.055) ** 2.4
-                b = b / 12.92 if b <= 0.03928 else ((b + 0.055) / 1.055) ** 2.4
-                return 0.2126 * r + 0.7152 * g + 0.0722 * b
-
-            l1 = get_luminance(color1)
-            l2 = get_luminance(color2)
+            l1 = _relative_luminance(color1)
+            l2 = _relative_luminance(color2)
             lighter = max(l1, l2)
             darker = min(l1, l2)
             contrast = (lighter + 0.05) / (darker + 0.05)
@@ -236,17 +453,18 @@ class ParallelColorProcessor:
         except Exception:
             return 0.5
 
-    def _calculate_saturation(self, color: str) -> float:
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _calculate_saturation(color: str) -> float:
         """Calculate saturation of a color."""
         try:
             hex_color = color.lstrip("#")
             if len(hex_color) != 6:
                 return 0.0
-            r, g, b = tuple(int(hex_color[i : i + 2], 16) for i in (0, 2, 4))
-            r, g, b = r / 255.0, g / 255.0, b / 255.0
-            max_val = max(r, g, b)
-            min_val = min(r, g, b)
-            return (max_val - min_val) / max_val if max_val > 0 else 0.0
+            # The ratio is the same on 0-255 ints as on 0-1 floats
+            rgb = bytes.fromhex(hex_color)
+            max_val = max(rgb)
+            return (max_val - min(rgb)) / max_val if max_val > 0 else 0.0
         except Exception:
             return 0.0
 
@@ -299,6 +517,17 @@ class ParallelImagePreprocessor:
     def __init__(self, max_workers: Optional[int] = None):
         """Initialize the parallel preprocessor."""
         self.max_workers = max_workers or min(4, (os.cpu_count() or 1) + 1)
+        # Default output directory, shared by every batch of this instance
+        # and removed by close() or when the preprocessor is collected
+        self._temp_dir: Optional[str] = None
+        self._cleanup: Optional[weakref.finalize] = None
+
+    def close(self) -> None:
+        """Remove the default output directory and everything in it."""
+        if self._cleanup is not None:
+            self._cleanup()
+            self._cleanup = None
+            self._temp_dir = None
 
     def preprocess_images(
         self,
@@ -318,16 +547,19 @@ class ParallelImagePreprocessor:
             Dictionary mapping original paths to preprocessed paths
         """
         if output_dir is None:
-            import tempfile
-
-            output_dir = tempfile.mkdtemp(prefix="nu_pywal_preprocess_")
+            # Reusing one directory lets later batches find images resized
+            # earlier, instead of creating a directory per batch
+            if self._temp_dir is None:
+                self._temp_dir = tempfile.mkdtemp(prefix="nu_pywal_preprocess_")
+                self._cleanup = weakref.finalize(
+                    self, shutil.rmtree, self._temp_dir, ignore_errors=True
+                )
+            output_dir = self._temp_dir
 
         util.create_dir(output_dir)
         results = {}
 
-        with concurrent.futures.ThreadPoolExecutor(
-            max_workers=self.max_workers
-        ) as executor:
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
             future_to_path = {
                 executor.submit(
                     self._preprocess_single_image, img_path, target_size, output_dir
@@ -351,12 +583,15 @@ class ParallelImagePreprocessor:
     ) -> Optional[str]:
         """Preprocess a single image."""
         try:
-            import hashlib
-
-            # Generate unique output filename
-            img_hash = hashlib.md5(
-                img_path.encode(), usedforsecurity=False
-            ).hexdigest()[:8]
+            # The output name covers the size and the source's version, so an
+            # existing file is only reused for the same resize of the same image
+            try:
+                stat = os.stat(img_path)
+                version = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                version = (0, 0)
+            name_key = f"{img_path}\0{target_size[0]}x{target_size[1]}\0{version}"
+            img_hash = hashlib.blake2b(name_key.encode(), digest_size=8).hexdigest()
             ext = os.path.splitext(img_path)[1] or ".jpg"
             output_path = os.path.join(output_dir, f"preprocessed_{img_hash}{ext}")
 
@@ -364,6 +599,15 @@ class ParallelImagePreprocessor:
             if os.path.exists(output_path):
                 return output_path
 
+            # Pillow resizes in-process, without starting ImageMagick per image
+            if Image is not None:
+                try:
+                    with Image.open(img_path) as img:
+                        img.resize(target_size, Image.BILINEAR).save(output_path)
+                    return output_path
+                except (OSError, ValueError) as e:
+                    logging.debug(f"Pillow couldn't resize {img_path}: {e}")
+
             # Use ImageMagick to resize
             cmd = [
                 "magick",
@@ -385,6 +629,16 @@ class ParallelImagePreprocessor:
             return None
 
 
+def _list_images(img_dir: str, recursive: bool) -> List[str]:
+    """List the image paths in a directory."""
+    if recursive:
+        images, _ = image.get_image_dir_recursive(img_dir)
+        return images
+
+    images, _ = image.get_image_dir(img_dir)
+    return [os.path.join(img_dir, img) for img in images]
+
+
 def process_directory_parallel(
     img_dir: str,
     light: bool = False,
@@ -400,7 +654,7 @@ def process_directory_parallel(
         img_dir: Directory containing images
         light: Generate light color schemes
         recursive: Search recursively
-        max_workers: Maximum number of worker threads
+        max_workers: Maximum number of workers
         find_best: Whether to find and return the best images
         best_count: Number of best images to return (if find_best=True)
 
@@ -415,25 +669,81 @@ def process_directory_parallel(
             img_dir, count=best_count, recursive=recursive
         )
     else:
-        if recursive:
-            images, _ = image.get_image_dir_recursive(img_dir)
-        else:
-            images, _ = image.get_image_dir(img_dir)
-            images = [os.path.join(img_dir, img) for img in images]
-
+        images = _list_images(img_dir, recursive)
         return processor.process_image_batch(images, light=light)
 
 
+def iter_directory_parallel(
+    img_dir: str,
+    light: bool = False,
+    recursive: bool = False,
+    max_workers: Optional[int] = None,
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Process a directory of images in parallel, yielding results as they complete.
+
+    Closing the iterator early cancels the images that haven't started yet,
+    so callers that only need one result don't pay for the whole directory.
+
+    Args:
+        img_dir: Directory containing images
+        light: Generate light color schemes
+        recursive: Search recursively
+        max_workers: Maximum number of workers
+
+    Yields:
+        Tuples of (image_path, color_scheme) in completion order
+    """
+    processor = ParallelColorProcessor(max_workers=max_workers)
+    images = _list_images(img_dir, recursive)
+    yield from processor.iter_image_batch(images, light=light)
+
+
+def _timed_backend_runs(
+    img_path: str, backend: str, iterations: int
+) -> List[Tuple[Optional[float], str]]:
+    """
+    Run a backend on an image several times in a row.
+
+    Returns:
+        For each iteration, the elapsed time and an empty string, or None
+        and the error that stopped it
+    """
+    runs: List[Tuple[Optional[float], str]] = []
+    for _ in range(iterations):
+        start_time = time.perf_counter()
+        try:
+            colors.get(img_path, backend=backend)
+        except Exception as e:
+            runs.append((None, str(e)))
+            continue
+        runs.append((time.perf_counter() - start_time, ""))
+
+    return runs
+
+
 def benchmark_backends(
-    img_path: str, backends: Optional[List[str]] = None, iterations: int = 3
+    img_path: str,
+    backends: Optional[List[str]] = None,
+    iterations: int = 3,
+    max_workers: Optional[int] = None,
+    use_processes: bool = True,
 ) -> Dict[str, Dict[str, Any]]:
     """
     Benchmark different backends on an image.
 
+    Backends are benchmarked concurrently in worker processes that import
+    every backend before the first timed run. Each backend's iterations
+    run one after another in a single worker.
+
     Args:
         img_path: Path to test image
         backends: List of backends to test (None for all)
         iterations: Number of iterations per backend
+        max_workers: Maximum number of workers (None for one per backend,
+            capped at the number of CPUs)
+        use_processes: Run in worker processes rather than threads, so
+            CPU-bound backends are not serialized by the GIL
 
     Returns:
         Dictionary with benchmark results for each backend
@@ -474,8 +784,8 @@ def benchmark_backends(
         pass
 
     # Benchmark available backends
-    for backend in available_backends:
-        backend_results = {
+    backend_results = {
+        backend: {
             "times": [],
             "success_count": 0,
             "error_count": 0,
@@ -483,39 +793,70 @@ def benchmark_backends(
             "success_rate": 0.0,
             "status": "available",
         }
-
-        logging.info(
-            f"Benchmarking backend '{backend}' with {iterations} iterations..."
+        for backend in available_backends
+    }
+
+    logging.info(
+        f"Benchmarking {len(available_backends)} backends with {iterations} iterations..."
+    )
+
+    max_workers = max_workers or min(len(available_backends), os.cpu_count() or 1)
+    if use_processes:
+        executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(tuple(available_backends),),
         )
-
-        for i in range(iterations):
-            start_time = time.time()
+    else:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    with executor:
+        # One task per backend runs its iterations in order, so only
+        # different backends run concurrently and each iteration sees the
+        # cache state left by the previous one
+        future_to_backend = {}
+        for backend in available_backends:
+            future = executor.submit(_timed_backend_runs, img_path, backend, iterations)
+            future_to_backend[future] = backend
+
+        for future in concurrent.futures.as_completed(future_to_backend):
+            backend = future_to_backend[future]
+            stats = backend_results[backend]
             try:
-                colors.get(img_path, backend=backend)
-                execution_time = time.time() - start_time
-                backend_results["times"].append(execution_time)
-                backend_results["success_count"] += 1
-                logging.debug(
-                    f"Backend {backend} iteration {i + 1}: {execution_time:.3f}s"
-                )
+                runs = future.result()
             except Exception as e:
-                backend_results["error_count"] += 1
-                logging.debug(f"Backend {backend} iteration {i + 1} failed: {e}")
+                stats["error_count"] += iterations
+                logging.debug(f"Backend {backend} benchmark failed: {e}")
+                continue
 
-        if backend_results["times"]:
-            backend_results["avg_time"] = sum(backend_results["times"]) / len(
-                backend_results["times"]
-            )
-            backend_results["min_time"] = min(backend_results["times"])
-            backend_results["max_time"] = max(backend_results["times"])
+            for i, (execution_time, error) in enumerate(runs):
+                if execution_time is None:
+                    stats["error_count"] += 1
+                    logging.debug(
+                        f"Backend {backend} iteration {i + 1} failed: {error}"
+                    )
+                else:
+                    stats["times"].append(execution_time)
+                    stats["success_count"] += 1
+                    logging.debug(
+                        f"Backend {backend} iteration {i + 1}: {execution_time:.3f}s"
+                    )
+
+    for backend in available_backends:
+        stats = backend_results[backend]
+
+        if stats["times"]:
+            stats["avg_time"] = sum(stats["times"]) / len(stats["times"])
+            stats["min_time"] = min(stats["times"])
+            stats["max_time"] = max(stats["times"])
 
-        backend_results["success_rate"] = backend_results["success_count"] / iterations
-        results[backend] = backend_results
+        stats["success_rate"] = stats["success_count"] / iterations
+        results[backend] = stats
 
-        if backend_results["success_count"] > 0:
+        if stats["success_count"] > 0:
             logging.info(
-                f"Backend '{backend}': {backend_results['avg_time']:.3f}s avg, "
-                f"{backend_results['success_rate']:.1%} success rate"
+                f"Backend '{backend}': {stats['avg_time']:.3f}s avg, "
+                f"{stats['success_rate']:.1%} success rate"
             )
         else:
             logging.warning(f"Backend '{backend}' failed all iterations")
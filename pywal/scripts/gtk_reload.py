@@ -14,6 +14,36 @@ import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 from util import ExecutableNotFoundError, PywalError, run_command
 
+try:
+    from gi.repository import Gio
+
+except (ImportError, ValueError):
+    Gio = None
+
+INTERFACE_SCHEMA = "org.gnome.desktop.interface"
+
+
+def reload_gtk_via_gio():
+    """Reload GTK themes through GSettings directly (GTK3/4)."""
+    if Gio is None:
+        return False
+
+    # Gio.Settings.new() aborts the process for an unknown schema
+    source = Gio.SettingsSchemaSource.get_default()
+    if source is None or source.lookup(INTERFACE_SCHEMA, True) is None:
+        return False
+
+    settings = Gio.Settings.new(INTERFACE_SCHEMA)
+    current_theme = settings.get_string("gtk-theme")
+
+    # Set theme to something else temporarily, then back, waiting for
+    # each write so both changes reach listening applications
+    settings.set_string("gtk-theme", "Adwaita")
+    Gio.Settings.sync()
+    settings.set_string("gtk-theme", current_theme)
+    Gio.Settings.sync()
+    return True
+
 
 def reload_gtk_via_gsettings():
     """Reload GTK themes via gsettings (GTK3/4)."""
@@ -71,6 +101,7 @@ def reload_gtk_via_xrdb():
 def gtk_reload():
     """Reload GTK themes using available methods."""
     methods = [
+        ("gio", reload_gtk_via_gio),
         ("gsettings", reload_gtk_via_gsettings),
         ("xsettingsd", reload_gtk_via_xsettingsd),
         ("xrdb", reload_gtk_via_xrdb),
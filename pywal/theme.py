@@ -18,9 +18,9 @@ def list_out():
     user_themes = [theme.name.replace(".json", "") for theme in list_themes_user()]
 
     try:
-        last_used_theme = util.read_file(os.path.join(CACHE_DIR, "last_used_theme"))[
-            0
-        ].replace(".json", "")
+        last_used_theme = util.read_first_line(
+            os.path.join(CACHE_DIR, "last_used_theme")
+        ).replace(".json", "")
     except FileNotFoundError:
         last_used_theme = ""
 
@@ -11,7 +11,15 @@ import re
 import shutil
 import subprocess
 import sys
-from typing import List, Optional, Union
+import time
+from functools import cached_property, lru_cache
+from typing import FrozenSet, List, Optional, Tuple, Union
+
+try:
+    import orjson
+
+except ImportError:
+    orjson = None
 
 
 # Custom Exceptions for better error handling
@@ -31,9 +39,24 @@ class InvalidPathError(PywalError):
     """Raised when a file path is invalid or unsafe."""
 
 
+# Everything but the digits of a template percent argument such as "20%".
+_NON_DIGIT_RE = re.compile(r"[\D.]")
+
+
+def _parse_percent(percent):
+    """Get a percent from a number or a template argument."""
+    if isinstance(percent, (int, float)):
+        return float(percent)
+    return float(_NON_DIGIT_RE.sub("", str(percent)))
+
+
 class Color:
     """Color formats."""
 
+    # alpha_num stays a class attribute since it is set once for all colors,
+    # so the alpha based formats below are not cached per instance.
+    __slots__ = ("hex_color", "__dict__")
+
     alpha_num = "100"
 
     def __init__(self, hex_color):
@@ -42,12 +65,12 @@ class Color:
     def __str__(self):
         return self.hex_color
 
-    @property
+    @cached_property
     def rgb(self):
         """Convert a hex color to rgb."""
         return "{},{},{}".format(*hex_to_rgb(self.hex_color))
 
-    @property
+    @cached_property
     def xrgba(self):
         """Convert a hex color to xrdb rgba."""
         return hex_to_xrgba(self.hex_color)
@@ -70,9 +93,9 @@ class Color:
     @property
     def decimal(self):
         """Export color in decimal."""
-        return "{}{}".format("#", int(self.hex_color[1:], 16))
+        return "{}{}".format("#", self.decimal_strip)
 
-    @property
+    @cached_property
     def decimal_strip(self):
         """Strip '#' from decimal color."""
         return int(self.hex_color[1:], 16)
@@ -80,53 +103,61 @@ class Color:
     @property
     def octal(self):
         """Export color in octal."""
-        return "{}{}".format("#", oct(int(self.hex_color[1:], 16))[2:])
+        return "{}{}".format("#", self.octal_strip)
 
-    @property
+    @cached_property
     def octal_strip(self):
         """Strip '#' from octal color."""
-        return oct(int(self.hex_color[1:], 16))[2:]
+        return oct(self.decimal_strip)[2:]
 
     @property
     def strip(self):
         """Strip '#' from color."""
         return self.hex_color[1:]
 
-    @property
+    @cached_property
     def red(self):
         """Red value as float between 0 and 1."""
         return "%.3f" % (hex_to_rgb(self.hex_color)[0] / 255.0)
 
-    @property
+    @cached_property
     def green(self):
         """Green value as float between 0 and 1."""
         return "%.3f" % (hex_to_rgb(self.hex_color)[1] / 255.0)
 
-    @property
+    @cached_property
     def blue(self):
         """Blue value as float between 0 and 1."""
         return "%.3f" % (hex_to_rgb(self.hex_color)[2] / 255.0)
 
     def lighten(self, percent):
         """Lighten color by percent."""
-        percent = float(re.sub(r"[\D\.]", "", str(percent)))
+        percent = _parse_percent(percent)
         return Color(lighten_color(self.hex_color, percent / 100))
 
     def darken(self, percent):
         """Darken color by percent."""
-        percent = float(re.sub(r"[\D\.]", "", str(percent)))
+        percent = _parse_percent(percent)
         return Color(darken_color(self.hex_color, percent / 100))
 
     def saturate(self, percent):
         """Saturate a color."""
-        percent = float(re.sub(r"[\D\.]", "", str(percent)))
+        percent = _parse_percent(percent)
         return Color(saturate_color(self.hex_color, percent / 100))
 
 
+# A ".." path component, which could walk out of the intended directory.
+_PARENT_DIR_RE = re.compile(r"(?:^|[\\/])\.\.(?:[\\/]|$)")
+
+# Pseudo-filesystems that are never read as files.
+_UNSAFE_PREFIXES = ("/proc", "/sys")
+
+
 def validate_path(file_path):
     """Validate file path for security."""
-    # Security: Prevent directory traversal attacks
-    if ".." in file_path or file_path.startswith(("/proc", "/sys")):
+    # Security: Prevent directory traversal attacks. Only whole ".."
+    # components count, so names such as "my..file" are allowed.
+    if file_path.startswith(_UNSAFE_PREFIXES) or _PARENT_DIR_RE.search(file_path):
         raise ValueError(f"Invalid file path: {file_path}")
 
     # Normalize the path
@@ -140,13 +171,28 @@ def validate_path(file_path):
 def read_file(input_file):
     """Read data from a file and trim newlines."""
     validated_path = validate_path(input_file)
-    with open(validated_path) as file:
-        return file.read().splitlines()
+    # One binary read and decode skips the text layer's newline translation;
+    # splitlines() handles every line ending itself.
+    with open(validated_path, "rb") as file:
+        return file.read().decode().splitlines()
+
+
+def read_first_line(input_file):
+    """Read only the first line of a file and trim the newline."""
+    validated_path = validate_path(input_file)
+    with open(validated_path, "rb") as file:
+        return file.readline().decode().rstrip("\r\n")
 
 
 def read_file_json(input_file):
     """Read data from a json file."""
     validated_path = validate_path(input_file)
+
+    # orjson decodes small palette files several times faster than json.
+    if orjson is not None:
+        with open(validated_path, "rb") as json_file:
+            return orjson.loads(json_file.read())
+
     with open(validated_path) as json_file:
         return json.load(json_file)
 
@@ -184,7 +230,10 @@ def save_file_json(data: object, export_file: str) -> None:
 
 def create_dir(directory):
     """Alias to create the cache dir."""
-    os.makedirs(directory, exist_ok=True)
+    # A single stat is cheaper than a mkdir that fails with EEXIST,
+    # which is the common case on every run after the first.
+    if not os.path.isdir(directory):
+        os.makedirs(directory, exist_ok=True)
 
 
 def setup_logging():
@@ -199,8 +248,10 @@ def setup_logging():
     logging.addLevelName(logging.WARNING, "\033[1;33mW")
 
 
+@lru_cache(maxsize=1024)
 def hex_to_rgb(color):
     """Convert a hex color to rgb."""
+    # Templates convert the same few palette colors many times per export
     return tuple(bytes.fromhex(color.strip("#")))
 
 
@@ -217,14 +268,21 @@ def rgb_to_hex(color):
 
 def darken_color(color, amount):
     """Darken a hex color."""
-    color = [int(col * (1 - amount)) for col in hex_to_rgb(color)]
-    return rgb_to_hex(color)
+    r, g, b = hex_to_rgb(color)
+    scale = 1 - amount
+    return rgb_to_hex((int(r * scale), int(g * scale), int(b * scale)))
 
 
 def lighten_color(color, amount):
     """Lighten a hex color."""
-    color = [int(col + (255 - col) * amount) for col in hex_to_rgb(color)]
-    return rgb_to_hex(color)
+    r, g, b = hex_to_rgb(color)
+    return rgb_to_hex(
+        (
+            int(r + (255 - r) * amount),
+            int(g + (255 - g) * amount),
+            int(b + (255 - b) * amount),
+        )
+    )
 
 
 def blend_color(color, color2):
@@ -232,15 +290,14 @@ def blend_color(color, color2):
     r1, g1, b1 = hex_to_rgb(color)
     r2, g2, b2 = hex_to_rgb(color2)
 
-    r3 = int(0.5 * r1 + 0.5 * r2)
-    g3 = int(0.5 * g1 + 0.5 * g2)
-    b3 = int(0.5 * b1 + 0.5 * b2)
-
-    return rgb_to_hex((r3, g3, b3))
+    # Halving the integer sum rounds down exactly like int(0.5 * a + 0.5 * b)
+    return rgb_to_hex(((r1 + r2) >> 1, (g1 + g2) >> 1, (b1 + b2) >> 1))
 
 
+@lru_cache(maxsize=1024)
 def saturate_color(color, amount):
     """Saturate a hex color."""
+    # Palettes repeat colors, and every one goes through colorsys twice
     r, g, b = hex_to_rgb(color)
     r, g, b = (x / 255.0 for x in (r, g, b))
     h, lightness, s = colorsys.rgb_to_hls(r, g, b)
@@ -346,16 +403,63 @@ def disown(cmd):
         if not executable:
             raise ExecutableNotFoundError(f"Command not found: {cmd_list[0]}")
 
-        # Start process in background without waiting
+        # Start process in background without waiting, in its own session so
+        # it outlives us. Python's own descriptors are non-inheritable already,
+        # so skip the close_fds scan of every open descriptor.
         subprocess.Popen(
-            cmd_list, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, shell=False
-        )  # Explicitly disable shell
+            cmd_list,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+            close_fds=False,
+            pass_fds=(),
+            shell=False,  # Explicitly disable shell
+        )
         return True
 
     except (subprocess.SubprocessError, OSError) as e:
         raise PywalError(f"Failed to execute command {cmd_list}: {e}") from e
 
 
+# Seconds a /proc scan is reused for, long enough to cover one reload pass.
+PROCESS_SCAN_TTL = 0.1
+
+# Time of the last /proc scan and the process names it found.
+_process_scan: Tuple[float, FrozenSet[str]] = (float("-inf"), frozenset())
+
+
+def _running_process_names():
+    """Get the names of running processes from /proc, None without it."""
+    global _process_scan
+
+    scanned_at, names = _process_scan
+    now = time.monotonic()
+    if now - scanned_at < PROCESS_SCAN_TTL:
+        return names
+
+    try:
+        entries = os.scandir("/proc")
+    except OSError:
+        return None
+
+    found = set()
+    with entries:
+        for entry in entries:
+            if not entry.name.isdigit():
+                continue
+            try:
+                with open(os.path.join(entry.path, "comm"), "rb") as comm:
+                    found.add(comm.read().rstrip(b"\n").decode(errors="replace"))
+            except OSError:
+                # The process exited while scanning
+                continue
+
+    names = frozenset(found)
+    _process_scan = (now, names)
+    return names
+
+
 def get_pid(name):
     """Check if process is running by name."""
     # Security: Validate process name to prevent injection
@@ -363,6 +467,12 @@ def get_pid(name):
         logging.warning(f"Invalid process name: {name}")
         return False
 
+    # Reading /proc avoids spawning pidof for every process checked. The
+    # kernel truncates process names to 15 characters.
+    names = _running_process_names()
+    if names is not None:
+        return name[:15] in names
+
     try:
         if platform.system() != "Darwin":
             run_command(["pidof", "-s", name], timeout=5)
@@ -3,15 +3,36 @@
 import ctypes
 import logging
 import os
+import pathlib
 import re
-import urllib.parse
+import shutil
+import sqlite3
+import stat
+from contextlib import closing
+from functools import lru_cache
 
 from . import util
 from .settings import CACHE_DIR, HOME, OS
 
+# xfconf-query properties that hold the XFCE wallpaper of each monitor
+_XFCONF_RE = re.compile(
+    r"^/backdrop/screen\d/monitor(?:0|\w*)/"
+    r"(?:(?:image-path|last-image)|workspace\d/last-image)$",
+    flags=re.M,
+)
 
+# Plasma script that sets the wallpaper on every desktop, "%s" is the image
+_KDE_SCRIPT = (
+    "var allDesktops = desktops();for (i=0;i<allDesktops.length;i++){"
+    'd = allDesktops[i];d.wallpaperPlugin = "org.kde.image";'
+    'd.currentConfigGroup = Array("Wallpaper", "org.kde.image", "General");'
+    'd.writeConfig("Image", "%s")};'
+)
+
+
+@lru_cache(maxsize=1)
 def get_desktop_env():
-    """Identify the current running desktop environment."""
+    """Identify the current running desktop environment, once per process."""
     desktop = os.environ.get("XDG_CURRENT_DESKTOP")
     if desktop:
         return desktop
@@ -62,18 +83,13 @@ def get_desktop_env():
 
 def xfconf(img):
     """Call xfconf to set the wallpaper on XFCE."""
-    xfconf_re = re.compile(
-        r"^/backdrop/screen\d/monitor(?:0|\w*)/"
-        r"(?:(?:image-path|last-image)|workspace\d/last-image)$",
-        flags=re.M,
-    )
     try:
         xfconf_data = util.run_command(
             ["xfconf-query", "--channel", "xfce4-desktop", "--list"],
             timeout=10,
             capture_output=True,
         )
-        paths = xfconf_re.findall(xfconf_data)
+        paths = _XFCONF_RE.findall(xfconf_data)
         for path in paths:
             util.disown(
                 [
@@ -90,126 +106,186 @@ def xfconf(img):
         logging.error(f"Failed to set XFCE wallpaper: {e}")
 
 
+# Wallpaper setters for window managers, in order of preference
+_WM_SETTERS = (
+    ("feh", ("--bg-fill",)),
+    ("xwallpaper", ("--zoom",)),
+    ("hsetroot", ("-fill",)),
+    ("nitrogen", ("--set-zoom-fill",)),
+    ("bgs", ("-z",)),
+    ("habak", ("-mS",)),
+    ("display", ("-backdrop", "-window", "root")),
+)
+
+
+@lru_cache(maxsize=1)
+def _find_wm_setter():
+    """Find the first installed wallpaper setter, once per process."""
+    for setter_name, args in _WM_SETTERS:
+        path = shutil.which(setter_name)
+        if path:
+            return setter_name, path, args
+
+        logging.debug(f"Wallpaper setter '{setter_name}' not found")
+
+    return None
+
+
 def set_wm_wallpaper(img):
     """Set the wallpaper for non desktop environments."""
-    wallpaper_setters = [
-        (["feh", "--bg-fill", img], "feh"),
-        (["xwallpaper", "--zoom", img], "xwallpaper"),
-        (["hsetroot", "-fill", img], "hsetroot"),
-        (["nitrogen", "--set-zoom-fill", img], "nitrogen"),
-        (["bgs", "-z", img], "bgs"),
-        (["habak", "-mS", img], "habak"),
-        (["display", "-backdrop", "-window", "root", img], "display"),
+    setter = _find_wm_setter()
+
+    if setter is None:
+        logging.error(
+            "No wallpaper setter found. Install one of: feh, xwallpaper, hsetroot, nitrogen, bgs, habak, imagemagick"
+        )
+        return
+
+    setter_name, path, args = setter
+    util.disown([path, *args, img])
+    logging.info(f"Wallpaper set using {setter_name}")
+
+
+def _file_uri(img):
+    """Get the file:// URI of an image, resolving relative paths."""
+    return pathlib.Path(os.path.abspath(img)).as_uri()
+
+
+def _set_cinnamon_wallpaper(img):
+    """Set the wallpaper on Cinnamon."""
+    util.disown(
+        [
+            "gsettings",
+            "set",
+            "org.cinnamon.desktop.background",
+            "picture-uri",
+            _file_uri(img),
+        ]
+    )
+
+
+def _set_gnome_wallpaper(img):
+    """Set the wallpaper on GNOME and Unity."""
+    util.disown(
+        [
+            "gsettings",
+            "set",
+            "org.gnome.desktop.background",
+            "picture-uri",
+            _file_uri(img),
+        ]
+    )
+
+
+def _set_mate_wallpaper(img):
+    """Set the wallpaper on MATE."""
+    util.disown(["gsettings", "set", "org.mate.background", "picture-filename", img])
+
+
+def _set_sway_wallpaper(img):
+    """Set the wallpaper on Sway."""
+    util.disown(["swaymsg", "output", "*", "bg", img, "fill"])
+
+
+def _set_hyprland_wallpaper(img):
+    """Set the wallpaper on Hyprland."""
+    util.disown(["hyprctl", "hyprpaper", "wallpaper", f",{img}"])
+
+
+def _set_river_wallpaper(img):
+    """Set the wallpaper on River."""
+    util.disown(["riverctl", "spawn", "swaybg", "-i", img, "-m", "fill"])
+
+
+def _set_wayfire_wallpaper(img):
+    """Set the wallpaper on Wayfire."""
+    util.disown(["wayfire", "-c", f"background = {img}"])
+
+
+def _set_wayland_wallpaper(img):
+    """Set the wallpaper on other Wayland compositors."""
+    # Generic Wayland fallback - try common Wayland wallpaper setters
+    wayland_setters = [
+        (["swaybg", "-i", img, "-m", "fill"], "swaybg"),
+        (["oguri"], "oguri"),
+        (["wpaperd"], "wpaperd"),
     ]
 
-    for cmd, setter_name in wallpaper_setters:
+    for cmd, setter_name in wayland_setters:
         try:
             util.disown(cmd)
-            logging.info(f"Wallpaper set using {setter_name}")
+            logging.info(f"Wayland wallpaper set using {setter_name}")
             return
         except util.ExecutableNotFoundError:
-            logging.debug(f"Wallpaper setter '{setter_name}' not found")
+            logging.debug(f"Wayland wallpaper setter '{setter_name}' not found")
             continue
 
-    logging.error(
-        "No wallpaper setter found. Install one of: feh, xwallpaper, hsetroot, nitrogen, bgs, habak, imagemagick"
+    logging.warning(
+        "No Wayland wallpaper setter found. Install swaybg, oguri, or wpaperd"
     )
-    return
-
 
-def set_desktop_wallpaper(desktop, img):
-    """Set the wallpaper for the desktop environment."""
-    desktop = str(desktop).lower()
-
-    if "xfce" in desktop or "xubuntu" in desktop:
-        xfconf(img)
-
-    elif "muffin" in desktop or "cinnamon" in desktop:
-        util.disown(
-            [
-                "gsettings",
-                "set",
-                "org.cinnamon.desktop.background",
-                "picture-uri",
-                "file://" + urllib.parse.quote(img),
-            ]
-        )
 
-    elif "gnome" in desktop or "unity" in desktop:
-        util.disown(
-            [
-                "gsettings",
-                "set",
-                "org.gnome.desktop.background",
-                "picture-uri",
-                "file://" + urllib.parse.quote(img),
-            ]
-        )
-
-    elif "mate" in desktop:
-        util.disown(
-            ["gsettings", "set", "org.mate.background", "picture-filename", img]
-        )
-
-    elif "sway" in desktop:
-        util.disown(["swaymsg", "output", "*", "bg", img, "fill"])
-
-    elif "hyprland" in desktop:
-        util.disown(["hyprctl", "hyprpaper", "wallpaper", f",{img}"])
-
-    elif "river" in desktop:
-        util.disown(["riverctl", "spawn", "swaybg", "-i", img, "-m", "fill"])
+def _set_awesome_wallpaper(img):
+    """Set the wallpaper on awesome."""
+    util.disown(
+        [
+            "awesome-client",
+            f"require('gears').wallpaper.maximized('{img}')",
+        ]
+    )
 
-    elif "wayfire" in desktop:
-        util.disown(["wayfire", "-c", f"background = {img}"])
 
-    elif "wayland" in desktop:
-        # Generic Wayland fallback - try common Wayland wallpaper setters
-        wayland_setters = [
-            (["swaybg", "-i", img, "-m", "fill"], "swaybg"),
-            (["oguri"], "oguri"),
-            (["wpaperd"], "wpaperd"),
+def _set_kde_wallpaper(img):
+    """Set the wallpaper on KDE Plasma."""
+    util.disown(
+        [
+            "qdbus",
+            "org.kde.plasmashell",
+            "/PlasmaShell",
+            "org.kde.PlasmaShell.evaluateScript",
+            _KDE_SCRIPT % img,
         ]
+    )
 
-        for cmd, setter_name in wayland_setters:
-            try:
-                util.disown(cmd)
-                logging.info(f"Wayland wallpaper set using {setter_name}")
-                return
-            except util.ExecutableNotFoundError:
-                logging.debug(f"Wayland wallpaper setter '{setter_name}' not found")
-                continue
-
-        logging.warning(
-            "No Wayland wallpaper setter found. Install swaybg, oguri, or wpaperd"
-        )
 
-    elif "awesome" in desktop:
-        util.disown(
-            [
-                "awesome-client",
-                f"require('gears').wallpaper.maximized('{img}')",
-            ]
+# Wallpaper setters keyed by a word in the desktop name, checked in order
+_DESKTOP_SETTERS = {
+    "xfce": xfconf,
+    "xubuntu": xfconf,
+    "muffin": _set_cinnamon_wallpaper,
+    "cinnamon": _set_cinnamon_wallpaper,
+    "gnome": _set_gnome_wallpaper,
+    "unity": _set_gnome_wallpaper,
+    "mate": _set_mate_wallpaper,
+    "sway": _set_sway_wallpaper,
+    "hyprland": _set_hyprland_wallpaper,
+    "river": _set_river_wallpaper,
+    "wayfire": _set_wayfire_wallpaper,
+    "wayland": _set_wayland_wallpaper,
+    "awesome": _set_awesome_wallpaper,
+    "kde": _set_kde_wallpaper,
+}
+
+
+@lru_cache(maxsize=8)
+def _find_desktop_setter(desktop):
+    """Find the wallpaper setter for a desktop name, once per name."""
+    desktop = str(desktop).casefold()
+
+    # Most desktop names are a single known word
+    setter = _DESKTOP_SETTERS.get(desktop)
+    if setter is None:
+        setter = next(
+            (func for name, func in _DESKTOP_SETTERS.items() if name in desktop),
+            set_wm_wallpaper,
         )
 
-    elif "kde" in desktop:
-        string = """
-            var allDesktops = desktops();for (i=0;i<allDesktops.length;i++){
-            d = allDesktops[i];d.wallpaperPlugin = "org.kde.image";
-            d.currentConfigGroup = Array("Wallpaper", "org.kde.image",
-            "General");d.writeConfig("Image", "%s")};
-        """
-        util.disown(
-            [
-                "qdbus",
-                "org.kde.plasmashell",
-                "/PlasmaShell",
-                "org.kde.PlasmaShell.evaluateScript",
-                string % img,
-            ]
-        )
-    else:
-        set_wm_wallpaper(img)
+    return setter
+
+
+def set_desktop_wallpaper(desktop, img):
+    """Set the wallpaper for the desktop environment."""
+    _find_desktop_setter(desktop)(img)
 
 
 def set_mac_wallpaper(img):
@@ -218,56 +294,65 @@ def set_mac_wallpaper(img):
     db_path = os.path.join(HOME, db_file)
 
     try:
-        # Put the image path in the database
-        sql = f'insert into data values("{img}"); '
-        util.run_command(["sqlite3", db_path, sql], timeout=10)
-
-        # Get the index of the new entry
-        sql = "select max(rowid) from data;"
-        new_entry = util.run_command(
-            ["sqlite3", db_path, sql], timeout=10, capture_output=True
-        )
-        new_entry = new_entry.strip()
-
-        # Get all picture ids (monitor/space pairs)
-        get_pics_cmd = ["sqlite3", db_path, "select rowid from pictures;"]
-        pictures = util.run_command(get_pics_cmd, timeout=10, capture_output=True)
-        pictures = pictures.split("\n")
-
-        # Clear all existing preferences
-        sql += "delete from preferences; "
-
-        # Write all pictures to the new image
-        for pic in pictures:
-            if pic:
-                sql += "insert into preferences (key, data_id, picture_id) "
-                sql += f"values(1, {new_entry}, {pic}); "
-
-        util.run_command(["sqlite3", db_path, sql], timeout=10)
+        with closing(sqlite3.connect(db_path, timeout=10)) as conn, conn:
+            # Put the image path in the database
+            new_entry = conn.execute("insert into data values(?)", (img,)).lastrowid
+
+            # Get all picture ids (monitor/space pairs)
+            pictures = [row[0] for row in conn.execute("select rowid from pictures")]
+
+            # Point every picture at the new image
+            conn.execute("delete from preferences")
+            conn.executemany(
+                "insert into preferences (key, data_id, picture_id) values(1, ?, ?)",
+                [(new_entry, pic) for pic in pictures],
+            )
 
         # Kill the dock to fix issues with cached wallpapers.
         # macOS caches wallpapers and if a wallpaper is set that shares
         # the filename with a cached wallpaper, the cached wallpaper is
-        # used instead.
-        util.run_command(["killall", "Dock"], timeout=10)
-    except util.PywalError as e:
+        # used instead. The database is committed by now, so there is
+        # nothing left to wait for once the Dock is told to restart.
+        util.disown(["killall", "Dock"])
+    except (sqlite3.Error, util.PywalError) as e:
         logging.error(f"Failed to set macOS wallpaper: {e}")
 
 
+# SystemParametersInfo action and flags: SPI_SETDESKWALLPAPER, and
+# SPIF_UPDATEINIFILE | SPIF_SENDCHANGE to persist it and notify windows.
+_SPI_SETDESKWALLPAPER = 20
+_SPIF_UPDATE_AND_SEND = 3
+
+if OS == "Windows":
+    # Python strings are passed as UTF-16, which only the W variant reads,
+    # whatever the architecture of Windows or of the interpreter.
+    _SystemParametersInfo = ctypes.windll.user32.SystemParametersInfoW
+
+
 def set_win_wallpaper(img):
     """Set the wallpaper on Windows."""
-    # There's a different command depending on the architecture
-    # of Windows. We check the PROGRAMFILES envar since using
-    # platform is unreliable.
-    if "x86" in os.environ["PROGRAMFILES"]:
-        ctypes.windll.user32.SystemParametersInfoW(20, 0, img, 3)
-    else:
-        ctypes.windll.user32.SystemParametersInfoA(20, 0, img, 3)
+    _SystemParametersInfo(_SPI_SETDESKWALLPAPER, 0, img, _SPIF_UPDATE_AND_SEND)
+
+
+# Real path and modification time of the last wallpaper this process set
+_last_set = None
 
 
 def change(img):
     """Set the wallpaper."""
-    if not os.path.isfile(img):
+    global _last_set
+
+    try:
+        info = os.stat(img)
+    except OSError:
+        return
+
+    if not stat.S_ISREG(info.st_mode):
+        return
+
+    wallpaper = (os.path.realpath(img), info.st_mtime_ns)
+    if wallpaper == _last_set:
+        logging.debug("Wallpaper unchanged, skipping.")
         return
 
     desktop = get_desktop_env()
@@ -282,13 +367,25 @@ def change(img):
         set_desktop_wallpaper(desktop, img)
 
     logging.info("Set the new wallpaper.")
+    _last_set = wallpaper
+
+
+@lru_cache(maxsize=8)
+def _read_wallpaper(path, mtime_ns, size):
+    """Read a cached wallpaper path, once per version of the file."""
+    return util.read_first_line(path)
 
 
 def get(cache_dir=CACHE_DIR):
     """Get the current wallpaper."""
     current_wall = os.path.join(cache_dir, "wal")
 
-    if os.path.isfile(current_wall):
-        return util.read_file(current_wall)[0]
+    try:
+        info = os.stat(current_wall)
+    except OSError:
+        return "None"
+
+    if not stat.S_ISREG(info.st_mode):
+        return "None"
 
-    return "None"
+    return _read_wallpaper(current_wall, info.st_mtime_ns, info.st_size)
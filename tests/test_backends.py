@@ -11,25 +11,24 @@ from pywal import colors
 class TestBackends(unittest.TestCase):
     """Test backend functions."""
 
-    def setUp(self):
+    @classmethod
+    def setUpClass(cls):
         """Set up test fixtures."""
-        # Create a temporary test image
-        self.test_image = os.path.join(
+        cls.test_image = os.path.join(
             os.path.dirname(__file__), "test_files", "test.jpg"
         )
-        if not os.path.exists(self.test_image):
-            # Create a minimal test image if it doesn't exist
-            self.test_image = tempfile.NamedTemporaryFile(
-                suffix=".jpg", delete=False
-            ).name
-
-    def tearDown(self):
+        cls.temp_image = None
+        if not os.path.exists(cls.test_image):
+            # Create an empty test image if it doesn't exist
+            fd, cls.temp_image = tempfile.mkstemp(suffix=".jpg")
+            os.close(fd)
+            cls.test_image = cls.temp_image
+
+    @classmethod
+    def tearDownClass(cls):
         """Clean up test fixtures."""
-        if hasattr(self, "test_image") and self.test_image.startswith("/tmp"):
-            try:
-                os.unlink(self.test_image)
-            except (OSError, FileNotFoundError):
-                pass
+        if cls.temp_image is not None:
+            os.unlink(cls.temp_image)
 
     def test_list_backends(self):
         """> Test backend listing."""
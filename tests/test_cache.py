@@ -1,8 +1,11 @@
 """Test cache functionality."""
 
 import os
+import sqlite3
 import tempfile
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import MagicMock, patch
 
 from pywal import cache
@@ -28,6 +31,132 @@ class TestAdvancedCache(unittest.TestCase):
         cache.AdvancedCache(cache_dir=cache_dir)
         self.assertTrue(os.path.exists(cache_dir))
 
+    def test_persistent_connection(self):
+        """> Test cache operations reuse one WAL mode connection."""
+        mode = self.cache._conn.execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, "wal")
+
+        with patch("pywal.cache.sqlite3.connect", side_effect=AssertionError):
+            self.cache.put("test_key", {"test": "data"})
+            self.assertEqual(self.cache.get("test_key"), {"test": "data"})
+            self.cache.cleanup()
+
+    def test_access_stats_batched(self):
+        """> Test cache hits are written back in batches."""
+        self.cache.put("test_key", {"test": "data"})
+        self.cache.get("test_key")
+        self.cache.get("test_key")
+
+        query = "SELECT access_count FROM cache_entries WHERE key = ?"
+        row = self.cache._conn.execute(query, ("test_key",)).fetchone()
+        self.assertEqual(row[0], 0)
+
+        analytics = self.cache.get_analytics()
+        self.assertEqual(analytics.most_accessed, [("test_key", 2)])
+
+    def test_avg_access_time(self):
+        """> Test the average access time is a mean over every hit."""
+        self.cache.put("test_key", {"test": "data"})
+
+        clock = iter([0, 1_000_000, 0, 3_000_000])
+        with patch("pywal.cache.time.monotonic_ns", side_effect=lambda: next(clock)):
+            self.cache.get("test_key")
+            self.cache.get("test_key")
+
+        analytics = self.cache.get_analytics()
+        self.assertAlmostEqual(analytics.avg_access_time, 0.002)
+
+    def test_memory_lru(self):
+        """> Test repeat hits are served from memory as fresh copies."""
+        self.cache.put("test_key", {"test": "data"})
+        first = self.cache.get("test_key")
+        first["alpha"] = "100"
+
+        with patch.object(self.cache, "_db", side_effect=AssertionError):
+            self.assertEqual(self.cache.get("test_key"), {"test": "data"})
+
+        self.cache.put("test_key", {"test": "new"})
+        self.assertEqual(self.cache.get("test_key"), {"test": "new"})
+
+        self.cache._remove_entry("test_key")
+        self.assertNotIn("test_key", self.cache._mem_lru)
+        self.assertIsNone(self.cache.get("test_key"))
+
+    def test_indexes(self):
+        """> Test the composite cleanup and deduplication indexes exist."""
+        rows = self.cache._conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index'"
+        ).fetchall()
+        names = {name for (name,) in rows}
+
+        self.assertLessEqual(
+            {"idx_accessed_access", "idx_access_accessed", "idx_image_hash"}, names
+        )
+        self.assertNotIn("idx_last_accessed", names)
+
+    def test_schema_setup_skipped(self):
+        """> Test reopening an up to date cache skips the schema setup."""
+        self.cache.close()
+        with patch.object(cache.AdvancedCache, "_db", side_effect=AssertionError):
+            reopened = cache.AdvancedCache(cache_dir=self.temp_dir)
+        self.assertIsNotNone(reopened._conn)
+        reopened.close()
+
+        # A cache with the old indexes is still migrated
+        conn = sqlite3.connect(os.path.join(self.temp_dir, "cache.db"))
+        conn.execute("CREATE INDEX idx_last_accessed ON cache_entries(last_accessed)")
+        conn.commit()
+        conn.close()
+
+        reopened = cache.AdvancedCache(cache_dir=self.temp_dir)
+        names = {
+            name for (name,) in reopened._conn.execute("SELECT name FROM sqlite_master")
+        }
+        self.assertNotIn("idx_last_accessed", names)
+        reopened.close()
+
+    def test_incremental_vacuum(self):
+        """> Test clearing the cache releases database pages."""
+        mode = self.cache._conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        self.assertEqual(mode, 2)
+
+        for i in range(200):
+            self.cache.put(f"key_{i}", {"colors": {"color0": f"#{i:06x}"}})
+        pages = self.cache._conn.execute("PRAGMA page_count").fetchone()[0]
+
+        self.assertTrue(self.cache.clear_all())
+        self.assertLess(
+            self.cache._conn.execute("PRAGMA page_count").fetchone()[0], pages
+        )
+
+    def test_queue_put(self):
+        """> Test queued writes are stored from a snapshot of the scheme."""
+        test_colors = {"special": {"background": "#000000"}}
+        self.cache.queue_put("test_key", test_colors, backend="wal")
+        test_colors["special"]["background"] = "#ffffff"
+
+        self.cache.flush_writes()
+        self.assertEqual(
+            self.cache.get("test_key"), {"special": {"background": "#000000"}}
+        )
+
+    def test_close_flushes_writes(self):
+        """> Test closing the cache stores queued writes first."""
+        self.cache.queue_put("test_key", {"test": "data"})
+        self.cache.close()
+
+        reopened = cache.AdvancedCache(cache_dir=self.temp_dir)
+        self.assertEqual(reopened.get("test_key"), {"test": "data"})
+        reopened.close()
+
+    def test_close(self):
+        """> Test closing the cache database."""
+        with patch("pywal.cache.atexit.unregister") as mock_unregister:
+            self.cache.close()
+        mock_unregister.assert_called_once_with(self.cache.close)
+        self.assertIsNone(self.cache._conn)
+        self.assertIsNone(self.cache.get("test_key"))
+
     @patch("os.stat")
     def test_generate_cache_key(self, mock_stat):
         """> Test cache key generation."""
@@ -50,6 +179,42 @@ class TestAdvancedCache(unittest.TestCase):
             )
             self.assertNotEqual(key, key3)
 
+    @patch("pywal.cache.xxhash", None)
+    @patch("os.stat")
+    def test_generate_cache_key_without_xxhash(self, mock_stat):
+        """> Test cache key generation falls back to BLAKE2."""
+        mock_stat.return_value.st_size = 1024
+        mock_stat.return_value.st_mtime = 1234567890
+
+        with patch.object(self.cache, "_get_image_hash", return_value="abcd1234"):
+            key = self.cache.generate_cache_key("/test/image.jpg", "wal", False, "")
+            self.assertEqual(len(key), 16)
+
+    def test_image_hash_head_and_tail(self):
+        """> Test image hashes cover the first and last chunks."""
+        img_path = os.path.join(self.temp_dir, "image.jpg")
+        with open(img_path, "wb") as f:
+            f.write(b"a" * 10 + b"b" * 10 + b"c" * 10)
+
+        expected = cache._new_hasher()
+        expected.update(b"a" * 10)
+        expected.update(b"c" * 10)
+        result = self.cache._get_image_hash(img_path, chunk_size=10)
+        self.assertEqual(result, expected.hexdigest()[:12])
+
+        empty_path = os.path.join(self.temp_dir, "empty.jpg")
+        open(empty_path, "wb").close()
+        result = self.cache._get_image_hash(empty_path)
+        self.assertEqual(result, cache._new_hasher().hexdigest()[:12])
+
+    def test_image_hash_memoized(self):
+        """> Test image hashes are reused for an unchanged file."""
+        img_path = "tests/test_files/test.jpg"
+        image_hash = self.cache._get_image_hash(img_path)
+
+        with patch("builtins.open", side_effect=AssertionError):
+            self.assertEqual(self.cache._get_image_hash(img_path), image_hash)
+
     @patch("os.stat")
     def test_put_and_get_cache_entry(self, mock_stat):
         """> Test storing and retrieving cache entries."""
@@ -76,11 +241,37 @@ class TestAdvancedCache(unittest.TestCase):
             self.assertIsNotNone(retrieved)
             self.assertEqual(retrieved["colors"]["color0"], "#000000")
 
+    def test_put_with_known_image_hash(self):
+        """> Test put() reuses an image hash passed by the caller."""
+        with patch.object(self.cache, "_get_image_hash", side_effect=AssertionError):
+            self.assertTrue(
+                self.cache.put(
+                    "test_key", {"test": "data"}, "/test/image.jpg", image_hash="abcd"
+                )
+            )
+
+        query = "SELECT image_hash FROM cache_entries WHERE key = ?"
+        row = self.cache._conn.execute(query, ("test_key",)).fetchone()
+        self.assertEqual(row[0], "abcd")
+
     def test_get_nonexistent_entry(self):
         """> Test retrieving non-existent cache entry."""
         result = self.cache.get("nonexistent_key")
         self.assertIsNone(result)
 
+    def test_get_missing_file(self):
+        """> Test a deleted scheme file is a miss and drops the entry."""
+        self.cache.put("test_key", {"test": "data"}, compress=False)
+        os.unlink(os.path.join(self.cache.schemes_dir, "test_key.json"))
+
+        with patch("pywal.cache.os.path.exists", side_effect=AssertionError):
+            self.assertIsNone(self.cache.get("test_key"))
+
+        query = "SELECT COUNT(*) FROM cache_entries WHERE key = ?"
+        row = self.cache._conn.execute(query, ("test_key",)).fetchone()
+        self.assertEqual(row[0], 0)
+        self.assertEqual(self.cache.stats.miss_count, 1)
+
     def test_compression(self):
         """> Test data compression via file operations."""
         # Test that files are compressed when compress=True
@@ -91,9 +282,46 @@ class TestAdvancedCache(unittest.TestCase):
         success = self.cache.put(cache_key, test_colors, compress=True)
         self.assertTrue(success)
 
-        # Verify compressed file exists
-        cache_file = os.path.join(self.cache.schemes_dir, f"{cache_key}.json.gz")
+        # Verify compressed file exists, zstd when available
+        suffix = ".json.zst" if cache.zstandard is not None else ".json.gz"
+        cache_file = os.path.join(self.cache.schemes_dir, f"{cache_key}{suffix}")
+        self.assertTrue(os.path.exists(cache_file))
+        self.assertEqual(self.cache.get(cache_key), test_colors)
+
+    def test_compression_saved_without_reserializing(self):
+        """> Test put() serializes the scheme only once."""
+        test_colors = {"colors": {f"color{i}": "#000000" for i in range(16)}}
+        with patch("pywal.cache._dumps", wraps=cache._dumps) as mock_dumps:
+            self.assertTrue(self.cache.put("test_key", test_colors))
+
+        mock_dumps.assert_called_once()
+        self.assertGreater(self.cache.stats.compression_saved, 0)
+
+    @patch("pywal.cache.orjson", None)
+    def test_stdlib_json_fallback(self):
+        """> Test cache entries round-trip without orjson."""
+        test_colors = {"colors": {"color0": "#000000"}}
+        self.assertTrue(self.cache.put("test_key", test_colors, compress=False))
+        self.assertEqual(self.cache.get("test_key"), test_colors)
+
+    def test_uncompressed_is_compact(self):
+        """> Test uncompressed entries are written without indentation."""
+        test_colors = {"colors": {"color0": "#000000"}}
+        self.assertTrue(self.cache.put("test_key", test_colors, compress=False))
+
+        cache_file = os.path.join(self.cache.schemes_dir, "test_key.json")
+        with open(cache_file, "rb") as f:
+            self.assertEqual(f.read(), b'{"colors":{"color0":"#000000"}}')
+
+    @patch("pywal.cache.zstandard", None)
+    def test_compression_gzip_fallback(self):
+        """> Test compressed storage falls back to gzip."""
+        test_colors = {"test": "data"}
+        self.assertTrue(self.cache.put("test_key", test_colors, compress=True))
+
+        cache_file = os.path.join(self.cache.schemes_dir, "test_key.json.gz")
         self.assertTrue(os.path.exists(cache_file))
+        self.assertEqual(self.cache.get("test_key"), test_colors)
 
     def test_database_operations(self):
         """> Test database creation and operations."""
@@ -128,6 +356,25 @@ class TestAdvancedCache(unittest.TestCase):
         removed = self.cache.cleanup(max_size_mb=0.001)  # Very small limit
         self.assertGreaterEqual(removed, 0)
 
+    def test_cleanup_removes_least_recently_used(self):
+        """> Test cleanup removes the oldest entries until the cache fits."""
+        for i in range(4):
+            self.cache.put(f"test_key_{i}", {"test": f"data_{i}"})
+            self.cache._conn.execute(
+                "UPDATE cache_entries SET size = 100, last_accessed = ? WHERE key = ?",
+                (time.time() + i, f"test_key_{i}"),
+            )
+
+        removed = self.cache.cleanup(
+            max_size_mb=250 / (1024 * 1024), keep_most_accessed=0
+        )
+        self.assertEqual(removed, 2)
+
+        keys = self.cache._conn.execute("SELECT key FROM cache_entries").fetchall()
+        self.assertEqual(sorted(keys), [("test_key_2",), ("test_key_3",)])
+        self.assertIsNone(self.cache.get("test_key_0"))
+        self.assertEqual(len(os.listdir(self.cache.schemes_dir)), 2)
+
     def test_get_cache_info(self):
         """> Test cache information retrieval."""
         # Add some test entries
@@ -139,6 +386,76 @@ class TestAdvancedCache(unittest.TestCase):
         self.assertIsInstance(analytics, cache.CacheStats)
         self.assertGreaterEqual(analytics.total_entries, 0)
 
+    def test_put_links_identical_payloads(self):
+        """> Test identical schemes are stored once and hard-linked."""
+        test_colors = {"colors": {"color0": "#000000"}}
+        self.assertTrue(self.cache.put("key_a", test_colors))
+
+        with patch("builtins.open", side_effect=AssertionError):
+            self.assertTrue(self.cache.put("key_b", test_colors))
+
+        rows = self.cache._conn.execute(
+            "SELECT file_path FROM cache_entries ORDER BY key"
+        ).fetchall()
+        path_a, path_b = (path for (path,) in rows)
+        self.assertTrue(os.path.samefile(path_a, path_b))
+
+        self.cache._remove_entry("key_a")
+        self.assertEqual(self.cache.get("key_b"), test_colors)
+
+    def test_put_overwrite_keeps_linked_payload(self):
+        """> Test rewriting one linked key leaves the other key's payload."""
+        old_colors = {"colors": {"color0": "#000000"}}
+        new_colors = {"colors": {"color0": "#ffffff"}}
+        self.cache.put("key_a", old_colors)
+        self.cache.put("key_b", old_colors)
+        self.cache.put("key_a", new_colors)
+        self.cache.close()
+
+        fresh = cache.AdvancedCache(cache_dir=self.temp_dir)
+        self.assertEqual(fresh.get("key_a"), new_colors)
+        self.assertEqual(fresh.get("key_b"), old_colors)
+        fresh.close()
+
+    def test_put_concurrent_writers_of_one_key(self):
+        """> Test concurrent writes of one key don't share a temporary file."""
+        payloads = [{"colors": {"color0": f"#00000{i}"}} for i in range(8)]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(
+                executor.map(lambda data: self.cache.put("key_a", data), payloads)
+            )
+
+        self.assertTrue(all(results))
+        self.assertIn(self.cache.get("key_a"), payloads)
+        leftovers = [
+            name for name in os.listdir(self.cache.schemes_dir) if ".tmp" in name
+        ]
+        self.assertEqual(leftovers, [])
+
+    def test_put_links_with_json_in_cache_dir(self):
+        """> Test deduplication only looks at the file name's extension."""
+        cache_dir = os.path.join(self.temp_dir, "colors.json.d")
+        json_cache = cache.AdvancedCache(cache_dir=cache_dir)
+        test_colors = {"colors": {"color0": "#000000"}}
+        json_cache.put("key_a", test_colors)
+        json_cache.put("key_b", test_colors)
+
+        rows = json_cache._conn.execute(
+            "SELECT file_path FROM cache_entries ORDER BY key"
+        ).fetchall()
+        path_a, path_b = (path for (path,) in rows)
+        self.assertTrue(os.path.samefile(path_a, path_b))
+        json_cache.close()
+
+    def test_put_does_not_link_other_formats(self):
+        """> Test payloads are only shared between files of one format."""
+        test_colors = {"colors": {"color0": "#000000"}}
+        self.assertTrue(self.cache.put("key_a", test_colors, compress=False))
+        self.assertTrue(self.cache.put("key_b", test_colors))
+
+        self.assertEqual(self.cache.get("key_a"), test_colors)
+        self.assertEqual(self.cache.get("key_b"), test_colors)
+
     def test_deduplication(self):
         """> Test cache deduplication."""
         # Create identical color schemes
@@ -154,10 +471,40 @@ class TestAdvancedCache(unittest.TestCase):
         removed = self.cache.deduplicate()
         self.assertGreaterEqual(removed, 0)
 
+    def test_deduplication_keeps_most_recent(self):
+        """> Test deduplication keeps the most recently accessed entry."""
+        with patch.object(self.cache, "_get_image_hash", return_value="same_hash"):
+            for i in range(3):
+                self.cache.put(f"key{i}", {"colors": {"color0": "#000000"}}, "/a")
+                self.cache._conn.execute(
+                    "UPDATE cache_entries SET last_accessed = ? WHERE key = ?",
+                    (float(i), f"key{i}"),
+                )
+
+        self.assertEqual(self.cache.deduplicate(), 2)
+
+        keys = self.cache._conn.execute("SELECT key FROM cache_entries").fetchall()
+        self.assertEqual(keys, [("key2",)])
+        self.assertEqual(len(os.listdir(self.cache.schemes_dir)), 1)
+
 
 class TestCacheFunctions(unittest.TestCase):
     """Test cache utility functions."""
 
+    @classmethod
+    def setUpClass(cls):
+        """Set up one cache shared by the error handling tests."""
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.shared_cache = cache.AdvancedCache(cache_dir=cls.temp_dir)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up the shared cache."""
+        import shutil
+
+        cls.shared_cache.close()
+        shutil.rmtree(cls.temp_dir, ignore_errors=True)
+
     @patch("pywal.cache.get_cache")
     def test_cache_get(self, mock_get_cache):
         """> Test cache_get function."""
@@ -178,17 +525,20 @@ class TestCacheFunctions(unittest.TestCase):
         """> Test cache_put function."""
         mock_cache = MagicMock()
         mock_get_cache.return_value = mock_cache
-        mock_cache.generate_cache_key.return_value = "test_key"
-        mock_cache.put.return_value = True
+        mock_cache._key_and_hash.return_value = ("test_key", "abcd1234")
 
         test_colors = {"test": "colors"}
         result = cache.cache_put("/test/image.jpg", "wal", False, test_colors, "")
         self.assertTrue(result)
-        mock_cache.generate_cache_key.assert_called_once_with(
+        mock_cache._key_and_hash.assert_called_once_with(
             "/test/image.jpg", "wal", False, ""
         )
-        mock_cache.put.assert_called_once_with(
-            "test_key", test_colors, "/test/image.jpg", "wal"
+        mock_cache.queue_put.assert_called_once_with(
+            "test_key",
+            test_colors,
+            "/test/image.jpg",
+            "wal",
+            image_hash="abcd1234",
         )
 
     @patch("pywal.cache.get_cache")
@@ -226,7 +576,7 @@ class TestCacheFunctions(unittest.TestCase):
     def test_cache_error_handling(self):
         """> Test cache error handling."""
         # Test JSON serialization error handling by testing the put method directly
-        test_cache = cache.AdvancedCache()
+        test_cache = self.shared_cache
 
         # Mock file operations to simulate IO error
         with patch("builtins.open", side_effect=OSError("Permission denied")):
@@ -235,24 +585,25 @@ class TestCacheFunctions(unittest.TestCase):
 
     def test_database_connection_error(self):
         """> Test database connection error handling."""
-        test_cache = cache.AdvancedCache()
+        test_cache = self.shared_cache
 
-        # Mock sqlite3.connect to fail during get_analytics call
-        with patch(
-            "pywal.cache.sqlite3.connect", side_effect=Exception("Database error")
-        ):
+        # The persistent connection is only reached through _db()
+        with patch.object(
+            test_cache, "_db", side_effect=sqlite3.Error("Database error")
+        ) as mock_db:
             analytics = test_cache.get_analytics()
+        mock_db.assert_called()
 
         # Should return CacheStats instance even on database error
         self.assertIsInstance(analytics, cache.CacheStats)
 
     def test_json_serialization_error(self):
         """> Test JSON serialization error handling."""
-        test_cache = cache.AdvancedCache()
+        test_cache = self.shared_cache
 
-        # Mock json.dump to raise TypeError to simulate serialization error
+        # Mock _dumps to raise TypeError to simulate serialization error
         with patch(
-            "pywal.cache.json.dump", side_effect=TypeError("Not JSON serializable")
+            "pywal.cache._dumps", side_effect=TypeError("Not JSON serializable")
         ):
             result = test_cache.put("test_key", {"test": "data"})
             self.assertFalse(result)
@@ -1,5 +1,6 @@
 """Test configuration validation and management."""
 
+import contextlib
 import json
 import os
 import tempfile
@@ -9,7 +10,62 @@ from unittest import mock
 from pywal import config
 
 
-class TestConfigValidator(unittest.TestCase):
+def patch_config_dirs(conf_dir, cache_dir):
+    """Point the config module's directory constants at other directories."""
+    paths = {
+        "CONF_DIR": conf_dir,
+        "CACHE_DIR": cache_dir,
+        "_TEMPLATES_DIR": os.path.join(conf_dir, "templates"),
+        "_COLORSCHEMES_DIR": os.path.join(conf_dir, "colorschemes"),
+        "_DARK_DIR": os.path.join(conf_dir, "colorschemes", "dark"),
+        "_LIGHT_DIR": os.path.join(conf_dir, "colorschemes", "light"),
+        "_THEMES_DIR": os.path.join(conf_dir, "themes"),
+        "_VERSION_FILE": os.path.join(conf_dir, "version"),
+        "_SCHEMES_CACHE_DIR": os.path.join(cache_dir, "schemes"),
+        "_OLD_CACHE_DIR": os.path.join(cache_dir, "colorschemes"),
+    }
+
+    paths["_REQUIRED_DIRS"] = tuple(
+        paths[name]
+        for name in (
+            "CONF_DIR",
+            "_TEMPLATES_DIR",
+            "_COLORSCHEMES_DIR",
+            "_DARK_DIR",
+            "_LIGHT_DIR",
+            "CACHE_DIR",
+            "_SCHEMES_CACHE_DIR",
+        )
+    )
+
+    stack = contextlib.ExitStack()
+    for name, path in paths.items():
+        stack.enter_context(mock.patch(f"pywal.config.{name}", path))
+    return stack
+
+
+class SharedTempDirMixin:
+    """Give a test class one temporary directory for all of its tests."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Create a temporary directory shared by the class's tests."""
+        cls._tmp = tempfile.TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the shared temporary directory."""
+        cls._tmp.cleanup()
+
+    def write_temp_file(self, name, content):
+        """Write a file in the shared temporary directory, return its path."""
+        path = os.path.join(self._tmp.name, name)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+
+class TestConfigValidator(SharedTempDirMixin, unittest.TestCase):
     """Test configuration validator functionality."""
 
     def setUp(self):
@@ -24,7 +80,18 @@ class TestConfigValidator(unittest.TestCase):
 
     def test_validate_hex_color_invalid(self):
         """> Test invalid hex color validation."""
-        invalid_colors = ["#GG0000", "12345", "#1234567", "", "red", None, 123]
+        invalid_colors = [
+            "#GG0000",
+            "12345",
+            "#1234567",
+            "",
+            "red",
+            "+ff",
+            " fff",
+            "f_f",
+            None,
+            123,
+        ]
         for color in invalid_colors:
             self.assertFalse(self.validator.validate_hex_color(color))
 
@@ -61,6 +128,10 @@ class TestConfigValidator(unittest.TestCase):
         self.assertFalse(self.validator.validate_color_palette(invalid_palette))
         errors = self.validator.get_errors()
         self.assertTrue(any("Missing colors:" in error for error in errors))
+        self.assertIn(
+            "Missing colors: ['color1', 'color2', 'color3', 'color4', 'color5',",
+            errors[-1],
+        )
 
     def test_validate_color_palette_invalid_hex(self):
         """> Test color palette validation with invalid hex colors."""
@@ -114,36 +185,81 @@ class TestConfigValidator(unittest.TestCase):
         }
         self.assertFalse(self.validator.validate_color_scheme(invalid_scheme))
 
+    def test_schema_validate(self):
+        """> Test a schema's built validator reports every failed check."""
+        schema = config.ConfigSchema(
+            required_fields={"name", "size"},
+            field_types={"name": str},
+            field_ranges={"size": (0, 10)},
+        )
+        self.assertEqual(schema.validate({"name": "x", "size": "5"}, ""), [])
+
+        errors = schema.validate({"name": 1, "size": "big"}, " in f")
+        self.assertEqual(
+            errors,
+            [
+                "Field 'name' in f must be str, got int",
+                "Field 'size' in f must be numeric",
+            ],
+        )
+        self.assertEqual(
+            schema.validate({"name": "x"}, ""),
+            ["Missing required fields: {'size'}"],
+        )
+
+    def test_validate_color_scheme_wallpaper(self):
+        """> Test color scheme validation of the wallpaper path."""
+        scheme = {
+            "alpha": "100",
+            "special": {
+                "background": "#000000",
+                "foreground": "#FFFFFF",
+                "cursor": "#FF0000",
+            },
+            "colors": {f"color{i}": f"#{i:02x}{i:02x}{i:02x}" for i in range(16)},
+        }
+        for wallpaper in ("/path/to/image.PNG", "None"):
+            scheme["wallpaper"] = wallpaper
+            self.assertTrue(self.validator.validate_color_scheme(scheme))
+
+        scheme["wallpaper"] = "/path/to/notes.txt"
+        self.assertFalse(self.validator.validate_color_scheme(scheme))
+
+        # Inputs that backtrack badly under a ".*\." pattern stay cheap
+        scheme["wallpaper"] = "a." * 100000 + "jpgx"
+        self.assertFalse(self.validator.validate_color_scheme(scheme))
+
     def test_validate_template_file_valid(self):
         """> Test valid template file validation."""
-        with tempfile.NamedTemporaryFile(
-            mode="w", suffix=".template", delete=False
-        ) as f:
-            f.write("background: {background}\ncolor0: {color0}")
-            f.flush()
-
-            try:
-                self.assertTrue(self.validator.validate_template_file(f.name))
-            finally:
-                os.unlink(f.name)
+        path = self.write_temp_file(
+            "valid.template", "background: {background}\ncolor0: {color0}"
+        )
+        self.assertTrue(self.validator.validate_template_file(path))
 
     def test_validate_template_file_with_warnings(self):
         """> Test template file validation with unknown placeholders."""
-        with tempfile.NamedTemporaryFile(
-            mode="w", suffix=".template", delete=False
-        ) as f:
-            f.write("background: {background}\ninvalid: {unknown_placeholder}")
-            f.flush()
-
-            try:
-                # Should still pass but with warnings
-                self.assertTrue(self.validator.validate_template_file(f.name))
-                warnings = self.validator.get_warnings()
-                self.assertTrue(
-                    any("Unknown placeholders" in warning for warning in warnings)
-                )
-            finally:
-                os.unlink(f.name)
+        path = self.write_temp_file(
+            "warnings.template",
+            "background: {background}\ninvalid: {unknown_placeholder}",
+        )
+
+        # Should still pass but with warnings
+        self.assertTrue(self.validator.validate_template_file(path))
+        warnings = self.validator.get_warnings()
+        self.assertTrue(any("Unknown placeholders" in warning for warning in warnings))
+
+    def test_validate_template_file_modifiers(self):
+        """> Test placeholders with modifiers are checked by their name."""
+        path = self.write_temp_file(
+            "modifiers.template",
+            "{color15.strip} {background.rgb} {color16} {colorx.rgb}",
+        )
+
+        self.assertTrue(self.validator.validate_template_file(path))
+        self.assertEqual(
+            self.validator.get_warnings(),
+            [f"Unknown placeholders in {path}: ['color16', 'colorx.rgb']"],
+        )
 
     def test_validate_template_file_nonexistent(self):
         """> Test template file validation with non-existent file."""
@@ -152,7 +268,7 @@ class TestConfigValidator(unittest.TestCase):
         self.assertTrue(any("does not exist" in error for error in errors))
 
 
-class TestConfigManager(unittest.TestCase):
+class TestConfigManager(SharedTempDirMixin, unittest.TestCase):
     """Test configuration manager functionality."""
 
     def setUp(self):
@@ -174,25 +290,65 @@ class TestConfigManager(unittest.TestCase):
             "colors": {f"color{i}": f"#{i:02x}{i:02x}{i:02x}" for i in range(16)},
         }
 
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".json", delete=False) as f:
-            json.dump(valid_scheme, f)
-            f.flush()
+        path = self.write_temp_file("valid.json", json.dumps(valid_scheme))
+        self.assertTrue(self.config_manager.validate_color_scheme_file(path))
+
+    def test_validate_color_scheme_file_precheck(self):
+        """> Test files missing required keys are rejected without parsing."""
+        path = self.write_temp_file(
+            "precheck.json", json.dumps({"wallpaper": "None", "alpha": "100"})
+        )
+
+        with mock.patch("pywal.config._loads", side_effect=AssertionError):
+            self.assertFalse(self.config_manager.validate_color_scheme_file(path))
+
+        errors = self.config_manager.validator.get_errors()
+        self.assertTrue(any("Missing required fields" in e for e in errors))
+
+    def test_validate_color_schemes_parallel(self):
+        """> Test scheme directories are validated with per-file reports."""
+        valid_scheme = {
+            "wallpaper": "None",
+            "alpha": "100",
+            "special": {
+                "background": "#000000",
+                "foreground": "#FFFFFF",
+                "cursor": "#FF0000",
+            },
+            "colors": {f"color{i}": f"#{i:02x}{i:02x}{i:02x}" for i in range(16)},
+        }
 
-            try:
-                self.assertTrue(self.config_manager.validate_color_scheme_file(f.name))
-            finally:
-                os.unlink(f.name)
+        with tempfile.TemporaryDirectory() as conf_dir:
+            dark_dir = os.path.join(conf_dir, "colorschemes", "dark")
+            os.makedirs(dark_dir)
+            for i in range(8):
+                with open(os.path.join(dark_dir, f"{i}.json"), "w") as f:
+                    json.dump(valid_scheme, f)
+            with open(os.path.join(dark_dir, "broken.json"), "w") as f:
+                f.write("{")
+
+            with patch_config_dirs(conf_dir, conf_dir), mock.patch(
+                "pywal.config.logging.log"
+            ) as mock_log:
+                self.config_manager._validate_color_schemes()
+
+        messages = [call.args[1] % call.args[2:] for call in mock_log.call_args_list]
+        self.assertEqual(len(messages), 2)
+        self.assertTrue(all("broken.json" in message for message in messages))
 
     def test_validate_color_scheme_file_invalid_json(self):
         """> Test color scheme file validation with invalid JSON."""
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".json", delete=False) as f:
-            f.write("invalid json content {")
-            f.flush()
+        # Every required key is present, so only the JSON parser rejects it
+        path = self.write_temp_file(
+            "invalid.json",
+            '{"special": {}, "colors": {}, "wallpaper": "", "alpha": "100",',
+        )
+        with mock.patch("pywal.config.logging.log") as mock_log:
+            self.assertFalse(self.config_manager.validate_color_scheme_file(path))
 
-            try:
-                self.assertFalse(self.config_manager.validate_color_scheme_file(f.name))
-            finally:
-                os.unlink(f.name)
+        messages = [call.args[1] % call.args[2:] for call in mock_log.call_args_list]
+        self.assertEqual(len(messages), 1)
+        self.assertIn("Cannot read color scheme file", messages[0])
 
     def test_validate_color_scheme_file_nonexistent(self):
         """> Test color scheme file validation with non-existent file."""
@@ -200,24 +356,34 @@ class TestConfigManager(unittest.TestCase):
             self.config_manager.validate_color_scheme_file("/nonexistent/file.json")
         )
 
-    @mock.patch("pywal.config.os.path.exists")
-    @mock.patch("pywal.config.os.path.isdir")
-    @mock.patch("pywal.config.os.access")
-    def test_validate_directory_structure(self, mock_access, mock_isdir, mock_exists):
+    def test_validate_directory_structure(self):
         """> Test directory structure validation."""
-        # Mock all directories exist, are directories, and are accessible
-        mock_exists.return_value = True
-        mock_isdir.return_value = True
-        mock_access.return_value = True
-
-        self.assertTrue(self.config_manager.validator.validate_directory_structure())
-
-    @mock.patch("pywal.config.os.path.exists")
-    def test_validate_directory_structure_missing_dirs(self, mock_exists):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            conf_dir = os.path.join(temp_dir, "config")
+            cache_dir = os.path.join(temp_dir, "cache")
+            for directory in (
+                os.path.join(conf_dir, "templates"),
+                os.path.join(conf_dir, "colorschemes", "dark"),
+                os.path.join(conf_dir, "colorschemes", "light"),
+                os.path.join(cache_dir, "schemes"),
+            ):
+                os.makedirs(directory)
+
+            with patch_config_dirs(conf_dir, cache_dir):
+                validator = self.config_manager.validator
+                self.assertTrue(validator.validate_directory_structure())
+                self.assertEqual(validator.get_warnings(), [])
+
+                # A file where a directory should be is an error
+                os.rmdir(os.path.join(conf_dir, "templates"))
+                open(os.path.join(conf_dir, "templates"), "w").close()
+                self.assertFalse(validator.validate_directory_structure())
+
+    def test_validate_directory_structure_missing_dirs(self):
         """> Test directory structure validation with missing directories."""
-        mock_exists.return_value = False
-
-        self.assertTrue(self.config_manager.validator.validate_directory_structure())
+        with patch_config_dirs("/nonexistent/config", "/nonexistent/cache"):
+            validator = self.config_manager.validator
+            self.assertTrue(validator.validate_directory_structure())
         warnings = self.config_manager.validator.get_warnings()
         self.assertTrue(any("does not exist" in warning for warning in warnings))
 
@@ -333,7 +499,7 @@ class TestConfigMigration(unittest.TestCase):
         mock_file.path = "/cache/colorschemes/test_scheme.json"
         mock_scandir.return_value = [mock_file]
 
-        with mock.patch("pywal.config.os.rename") as mock_rename:
+        with mock.patch("pywal.config.os.replace") as mock_replace:
             result = self.migration.migrate_cache_structure()
             self.assertTrue(result)
             # Only called if old directory exists and new doesn't
@@ -341,7 +507,7 @@ class TestConfigMigration(unittest.TestCase):
                 "/cache/colorschemes"
             ) and not mock_exists.side_effect("/cache/schemes"):
                 mock_create_dir.assert_called()
-                mock_rename.assert_called()
+                mock_replace.assert_called()
 
     @mock.patch("pywal.config.util.create_dir")
     def test_migrate_config_structure(self, mock_create_dir):
@@ -354,6 +520,29 @@ class TestConfigMigration(unittest.TestCase):
             # Should create required directories
             self.assertGreater(mock_create_dir.call_count, 0)
 
+    def test_migrate_themes_by_brightness(self):
+        """> Test old themes are sorted into light and dark."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            themes_dir = os.path.join(temp_dir, "themes")
+            os.makedirs(themes_dir)
+            backgrounds = {"bright": "#f0f0f0", "dim": "#101010", "grey": "#808080"}
+            for name, background in backgrounds.items():
+                with open(os.path.join(themes_dir, f"{name}.json"), "w") as f:
+                    json.dump({"special": {"background": background}}, f)
+
+            with patch_config_dirs(temp_dir, temp_dir):
+                self.assertTrue(self.migration.migrate_config_structure())
+
+            schemes_dir = os.path.join(temp_dir, "colorschemes")
+            self.assertEqual(
+                sorted(os.listdir(os.path.join(schemes_dir, "light"))),
+                ["bright.json", "grey.json"],
+            )
+            self.assertEqual(
+                os.listdir(os.path.join(schemes_dir, "dark")), ["dim.json"]
+            )
+            self.assertFalse(os.path.exists(themes_dir))
+
     @mock.patch("pywal.config.os.path.exists")
     @mock.patch("pywal.config.os.scandir")
     def test_migrate_template_variables(self, mock_scandir, mock_exists):
@@ -368,9 +557,9 @@ class TestConfigMigration(unittest.TestCase):
         mock_scandir.return_value = [mock_file]
 
         template_content = (
-            "background: {color.background}\nforeground: {color.foreground}"
+            b"background: {color.background}\nforeground: {color.foreground}"
         )
-        expected_content = "background: {background}\nforeground: {foreground}"
+        expected_content = b"background: {background}\nforeground: {foreground}"
 
         with mock.patch(
             "builtins.open", mock.mock_open(read_data=template_content)
@@ -426,23 +615,28 @@ class TestConfigMigration(unittest.TestCase):
 
     @mock.patch("shutil.copytree")
     @mock.patch("shutil.copy2")
-    @mock.patch("pywal.config.os.listdir")
+    @mock.patch("pywal.config.os.scandir")
     @mock.patch("pywal.config.os.path.exists")
-    @mock.patch("pywal.config.os.path.isdir")
     @mock.patch("pywal.config.util.create_dir")
     def test_backup_config(
         self,
         mock_create_dir,
-        mock_isdir,
         mock_exists,
-        mock_listdir,
+        mock_scandir,
         mock_copy2,
         mock_copytree,
     ):
         """> Test configuration backup."""
         mock_exists.return_value = True
-        mock_listdir.return_value = ["templates", "colorschemes", "version"]
-        mock_isdir.side_effect = lambda x: "templates" in x or "colorschemes" in x
+
+        entries = []
+        for name in ("templates", "colorschemes", "version", "backup_old"):
+            entry = mock.MagicMock()
+            entry.name = name
+            entry.path = os.path.join("/conf", name)
+            entry.is_dir.return_value = name != "version"
+            entries.append(entry)
+        mock_scandir.return_value = entries
 
         backup_dir = self.migration.backup_config()
         self.assertIsNotNone(backup_dir)
@@ -450,9 +644,24 @@ class TestConfigMigration(unittest.TestCase):
 
         # Should create backup directory and copy files
         mock_create_dir.assert_called()
-        mock_copytree.assert_called()  # For directories
+        self.assertEqual(mock_copytree.call_count, 2)  # For directories
         mock_copy2.assert_called()  # For files
 
+    def test_clone_file_is_independent_copy(self):
+        """> Test backup copies don't change with the original."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            src = os.path.join(temp_dir, "template")
+            dst = os.path.join(temp_dir, "backup")
+            with open(src, "w") as f:
+                f.write("{background}")
+
+            self.assertEqual(config._clone_file(src, dst), dst)
+
+            with open(src, "w") as f:
+                f.write("{color0}")
+            with open(dst) as f:
+                self.assertEqual(f.read(), "{background}")
+
 
 class TestMigrationCLI(unittest.TestCase):
     """Test migration CLI commands."""
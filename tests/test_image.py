@@ -1,6 +1,9 @@
 """Test image functions."""
 
+import os
+import tempfile
 import unittest
+from unittest import mock
 
 from pywal import image
 
@@ -28,6 +31,61 @@ class TestImage(unittest.TestCase):
         with self.assertRaises(SystemExit):
             image.get("tests")
 
+    def test_reservoir_sample_dir(self):
+        """> Sample a bounded number of images from a directory."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.mkdir(os.path.join(tmp_dir, "sub"))
+            for i in range(10):
+                open(os.path.join(tmp_dir, f"{i}.jpg"), "w").close()
+                open(os.path.join(tmp_dir, "sub", f"{i}.png"), "w").close()
+            open(os.path.join(tmp_dir, "notes.txt"), "w").close()
+
+            flat = image.reservoir_sample_dir(tmp_dir, k=20)
+            sample = image.reservoir_sample_dir(tmp_dir, k=5, recursive=True)
+
+        self.assertEqual(len(flat), 10)
+        self.assertTrue(all(img.endswith(".jpg") for img in flat))
+        self.assertEqual(len(sample), 5)
+        self.assertEqual(len(set(sample)), 5)
+
+    def test_reservoir_sample_dir_unreadable(self):
+        """> Skip directories that can't be listed while sampling."""
+        real_scandir = os.scandir
+
+        def scandir(path):
+            if os.path.basename(path) == "sub":
+                raise PermissionError(path)
+            return real_scandir(path)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.mkdir(os.path.join(tmp_dir, "sub"))
+            open(os.path.join(tmp_dir, "1.jpg"), "w").close()
+            open(os.path.join(tmp_dir, "sub", "2.jpg"), "w").close()
+
+            with mock.patch("pywal.image.os.scandir", side_effect=scandir):
+                sample = image.reservoir_sample_dir(tmp_dir, recursive=True)
+
+            self.assertEqual(sample, [os.path.join(tmp_dir, "1.jpg")])
+
+    @mock.patch("pywal.image.wallpaper.get", return_value="/old/2.png")
+    def test_get_image_dir_recursive(self, mock_get):
+        """> List images recursively in the same order as os.walk."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.makedirs(os.path.join(tmp_dir, "a", "b"))
+            for name in ("1.jpg", "a/2.png", "a/b/3.gif", "a/notes.txt"):
+                open(os.path.join(tmp_dir, name), "w").close()
+
+            images, current = image.get_image_dir_recursive(tmp_dir)
+            expected = [
+                os.path.join(path, name)
+                for path, _, files in os.walk(tmp_dir)
+                for name in files
+                if not name.endswith(".txt")
+            ]
+
+        self.assertEqual(images, expected)
+        self.assertEqual(current, os.path.join(tmp_dir, "a", "2.png"))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,6 +1,9 @@
 """Test parallel processing functionality."""
 
+import os
 import tempfile
+import threading
+import time
 import unittest
 from unittest import mock
 
@@ -20,6 +23,12 @@ class TestParallelColorProcessor(unittest.TestCase):
         self.assertIsInstance(processor.max_workers, int)
         self.assertGreater(processor.max_workers, 0)
 
+    def test_init_thread_workers(self):
+        """> Test processor initialization with default thread workers."""
+        processor = parallel.ParallelColorProcessor(use_processes=False)
+        self.assertGreater(processor.max_workers, 0)
+        self.assertLessEqual(processor.max_workers, 4)
+
     def test_init_custom_workers(self):
         """> Test processor initialization with custom workers."""
         processor = parallel.ParallelColorProcessor(max_workers=8)
@@ -72,15 +81,128 @@ class TestParallelColorProcessor(unittest.TestCase):
         self.assertEqual(result, {"cached": "colors"})
         self.assertEqual(self.processor.stats["cache_hits"], 1)
 
+    @mock.patch("pywal.parallel.os.path.isfile")
+    @mock.patch("pywal.parallel.colors.file")
+    @mock.patch("pywal.parallel.colors.cache_fname")
+    def test_process_image_listed_cache(
+        self, mock_cache_fname, mock_colors_file, mock_isfile
+    ):
+        """> Test cache hits are found in the batch's scheme listing."""
+        mock_cache_fname.return_value = ["/cache", "schemes", "test.json"]
+        mock_colors_file.return_value = {"cached": "colors"}
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            os.makedirs(os.path.join(temp_dir, "schemes"))
+            open(os.path.join(temp_dir, "schemes", "test.json"), "w").close()
+            with mock.patch("pywal.parallel.CACHE_DIR", temp_dir):
+                cached_schemes = parallel._list_cached_schemes()
+
+        result, stats = parallel._process_image(
+            "/test/image.jpg", False, ["wal"], "", cached_schemes
+        )
+
+        self.assertEqual(cached_schemes, frozenset({"test.json"}))
+        self.assertEqual(result, {"cached": "colors"})
+        self.assertEqual(stats["cache_hits"], 1)
+        mock_isfile.assert_not_called()
+
+    @mock.patch("pywal.parallel.colors.file")
+    def test_load_scheme_cached(self, mock_colors_file):
+        """> Test a cached scheme is parsed once until the file changes."""
+        mock_colors_file.return_value = {"colors": {"color0": "#000000"}}
+        parallel._load_scheme_cached.cache_clear()
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache_file = os.path.join(temp_dir, "test.json")
+            open(cache_file, "w").close()
+
+            first = parallel._load_scheme(cache_file)
+            first["colors"]["color0"] = "#ffffff"
+            second = parallel._load_scheme(cache_file)
+            self.assertEqual(mock_colors_file.call_count, 1)
+
+            os.utime(cache_file, ns=(0, 0))
+            parallel._load_scheme(cache_file)
+
+        self.assertEqual(second, {"colors": {"color0": "#000000"}})
+        self.assertEqual(mock_colors_file.call_count, 2)
+
+    def test_iter_image_batch_stops_early(self):
+        """> Test that closing the batch iterator cancels pending images."""
+        processor = parallel.ParallelColorProcessor(max_workers=2, use_processes=False)
+        images = [f"/test/image{i}.jpg" for i in range(20)]
+        stats = {
+            "cache_hits": 0,
+            "cache_misses": 1,
+            "backend_attempts": ["wal"],
+            "backend_successes": ["wal"],
+        }
+
+        def slow_process(*_args):
+            time.sleep(0.01)
+            return {"test": "colors"}, stats
+
+        with mock.patch(
+            "pywal.parallel._process_image", side_effect=slow_process
+        ) as mock_process:
+            results = processor.iter_image_batch(images, backends=["wal"])
+            img_path, result = next(results)
+            results.close()
+
+        self.assertIn(img_path, images)
+        self.assertEqual(result, {"test": "colors"})
+        self.assertLess(mock_process.call_count, len(images))
+        self.assertGreaterEqual(processor.stats["images_processed"], 1)
+        self.assertGreaterEqual(processor.stats["backend_successes"]["wal"], 1)
+
+    def test_process_image_batch_single_image_inline(self):
+        """> Test a single image is processed without starting a pool."""
+        stats = {
+            "cache_hits": 1,
+            "cache_misses": 0,
+            "backend_attempts": ["wal"],
+            "backend_successes": [],
+        }
+
+        with mock.patch(
+            "pywal.parallel._process_image", return_value=({"test": "colors"}, stats)
+        ), mock.patch("pywal.parallel.ProcessPoolExecutor") as mock_pool:
+            results = self.processor.process_image_batch(
+                ["/test/image.jpg"], backends=["wal"]
+            )
+
+        self.assertEqual(results, {"/test/image.jpg": {"test": "colors"}})
+        mock_pool.assert_not_called()
+        self.assertEqual(self.processor.stats["images_processed"], 1)
+        self.assertEqual(self.processor.stats["cache_hits"], 1)
+
+    def test_process_image_batch_in_processes(self):
+        """> Test worker process statistics are merged into the processor."""
+        images = ["/test/missing1.jpg", "/test/missing2.jpg"]
+
+        results = self.processor.process_image_batch(images, backends=["wal"])
+
+        self.assertEqual(results, {})
+        self.assertEqual(self.processor.stats["backend_attempts"]["wal"], 2)
+        self.assertEqual(self.processor.stats["backend_successes"]["wal"], 0)
+
     def test_calculate_contrast(self):
         """> Test contrast calculation between colors."""
         # Black and white should have high contrast
         contrast = self.processor._calculate_contrast("#000000", "#FFFFFF")
         self.assertGreater(contrast, 0.8)
+        self.assertAlmostEqual(contrast, 1.0)
+
+        # Mid gray has a WCAG luminance of 0.21586, a 5.3172:1 ratio to black
+        contrast = self.processor._calculate_contrast("#808080", "#000000")
+        self.assertAlmostEqual(contrast, 5.3172 / 21.0, places=5)
 
         # Same colors should have low contrast
         contrast = self.processor._calculate_contrast("#FF0000", "#FF0000")
         self.assertLess(contrast, 0.1)
+        self.assertAlmostEqual(
+            contrast, self.processor._calculate_contrast("#FF0000", "#ff0000")
+        )
 
     def test_calculate_saturation(self):
         """> Test saturation calculation."""
@@ -116,6 +238,33 @@ class TestParallelColorProcessor(unittest.TestCase):
         self.assertGreaterEqual(score, 0.0)
         self.assertLessEqual(score, 1.0)
 
+    def test_calculate_image_score_cached(self):
+        """> Test repeated palettes are scored once."""
+        schemes = [
+            {
+                "colors": {
+                    f"color{i}": f"#{i * 15:02x}{shade:02x}00" for i in range(16)
+                },
+                "special": {"background": "#000000", "foreground": "#FFFFFF"},
+            }
+            for shade in (0, 255)
+        ]
+
+        with mock.patch.dict(parallel._score_cache, clear=True), mock.patch(
+            "pywal.parallel.SCORE_CACHE_SIZE", 1
+        ), mock.patch.object(
+            self.processor, "_calculate_variance", return_value=0.5
+        ) as mock_variance:
+            first = self.processor._calculate_image_score(schemes[0])
+            self.assertEqual(self.processor._calculate_image_score(schemes[0]), first)
+            self.assertEqual(mock_variance.call_count, 1)
+
+            # The least recently used palette is evicted
+            self.processor._calculate_image_score(schemes[1])
+            self.processor._calculate_image_score(schemes[0])
+            self.assertEqual(mock_variance.call_count, 3)
+            self.assertEqual(len(parallel._score_cache), 1)
+
     def test_get_stats(self):
         """> Test statistics retrieval."""
         # Set some stats
@@ -155,6 +304,26 @@ class TestParallelImagePreprocessor(unittest.TestCase):
         self.assertIsInstance(preprocessor.max_workers, int)
         self.assertGreater(preprocessor.max_workers, 0)
 
+    @mock.patch("pywal.parallel.Image")
+    def test_preprocess_images_temp_dir(self, mock_image):
+        """> Test the default directory never reuses a stale resize."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            src = os.path.join(tmp_dir, "a.jpg")
+            open(src, "w").close()
+
+            large = self.preprocessor.preprocess_images([src], (64, 64))[src]
+            small = self.preprocessor.preprocess_images([src], (32, 32))[src]
+            os.utime(src, ns=(0, 0))
+            changed = self.preprocessor.preprocess_images([src], (64, 64))[src]
+
+        temp_dir = self.preprocessor._temp_dir
+        self.assertEqual(os.path.dirname(large), temp_dir)
+        self.assertEqual(os.path.dirname(small), temp_dir)
+        self.assertEqual(len({large, small, changed}), 3)
+
+        self.preprocessor.close()
+        self.assertFalse(os.path.exists(temp_dir))
+
     @mock.patch("pywal.parallel.util.run_command")
     @mock.patch("pywal.parallel.os.path.exists")
     def test_preprocess_single_image_success(self, mock_exists, mock_run_command):
@@ -170,6 +339,23 @@ class TestParallelImagePreprocessor(unittest.TestCase):
             self.assertIsNotNone(result)
             self.assertTrue(result.startswith(temp_dir))
 
+    @mock.patch("pywal.parallel.util.run_command")
+    @mock.patch("pywal.parallel.Image")
+    def test_preprocess_single_image_pillow(self, mock_image, mock_run_command):
+        """> Test preprocessing resizes with Pillow when it is installed."""
+        img = mock_image.open.return_value.__enter__.return_value
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            result = self.preprocessor._preprocess_single_image(
+                "/test/image.png", (64, 32), temp_dir
+            )
+
+        self.assertTrue(result.endswith(".png"))
+        img.resize.assert_called_once_with((64, 32), mock_image.BILINEAR)
+        img.resize.return_value.save.assert_called_once_with(result)
+        mock_run_command.assert_not_called()
+
+    @mock.patch("pywal.parallel.Image", None)
     @mock.patch("pywal.parallel.util.run_command")
     def test_preprocess_single_image_failure(self, mock_run_command):
         """> Test single image preprocessing failure."""
@@ -253,7 +439,9 @@ class TestParallelUtilities(unittest.TestCase):
         with mock.patch("builtins.__import__"):
             with mock.patch("pywal.parallel.sys.modules") as mock_modules:
                 mock_modules.__getitem__.return_value = mock_backend
-                results = parallel.benchmark_backends("/test/image.jpg", iterations=2)
+                results = parallel.benchmark_backends(
+                    "/test/image.jpg", iterations=2, use_processes=False
+                )
 
         self.assertIn("wal", results)
         self.assertIn("colorthief", results)
@@ -280,7 +468,10 @@ class TestParallelUtilities(unittest.TestCase):
             with mock.patch("pywal.parallel.sys.modules") as mock_modules:
                 mock_modules.__getitem__.return_value = mock_backend
                 results = parallel.benchmark_backends(
-                    "/test/image.jpg", backends=["wal"], iterations=2
+                    "/test/image.jpg",
+                    backends=["wal"],
+                    iterations=2,
+                    use_processes=False,
                 )
 
         self.assertIn("wal", results)
@@ -289,6 +480,30 @@ class TestParallelUtilities(unittest.TestCase):
         self.assertEqual(stats["error_count"], 1)
         self.assertEqual(stats["success_rate"], 0.5)
 
+    @mock.patch("pywal.parallel.colors.get")
+    def test_benchmark_backends_runs_iterations_in_order(self, mock_colors_get):
+        """> Test each backend's iterations run one after another in a task."""
+        calls = []
+        mock_colors_get.side_effect = lambda img, backend: calls.append(
+            (backend, threading.get_ident())
+        )
+
+        mock_backend = mock.MagicMock()
+        with mock.patch("builtins.__import__"):
+            with mock.patch("pywal.parallel.sys.modules") as mock_modules:
+                mock_modules.__getitem__.return_value = mock_backend
+                results = parallel.benchmark_backends(
+                    "/test/image.jpg",
+                    backends=["wal", "colorthief"],
+                    iterations=3,
+                    use_processes=False,
+                )
+
+        for backend in ("wal", "colorthief"):
+            threads = {ident for name, ident in calls if name == backend}
+            self.assertEqual(len(threads), 1)
+            self.assertEqual(results[backend]["success_count"], 3)
+
     @mock.patch("pywal.parallel.colors.list_backends")
     def test_benchmark_backends_unavailable(self, mock_list_backends):
         """> Test backend benchmarking with unavailable backends."""
@@ -298,7 +513,9 @@ class TestParallelUtilities(unittest.TestCase):
         with mock.patch(
             "builtins.__import__", side_effect=ImportError("Backend not found")
         ):
-            results = parallel.benchmark_backends("/test/image.jpg", iterations=2)
+            results = parallel.benchmark_backends(
+                "/test/image.jpg", iterations=2, use_processes=False
+            )
 
         # When all backends are unavailable, should return empty dict
         self.assertEqual(results, {})
@@ -319,7 +536,9 @@ class TestParallelUtilities(unittest.TestCase):
         with mock.patch("builtins.__import__", side_effect=mock_import):
             with mock.patch("pywal.parallel.sys.modules") as mock_modules:
                 mock_modules.__getitem__.return_value = mock_backend
-                results = parallel.benchmark_backends("/test/image.jpg", iterations=2)
+                results = parallel.benchmark_backends(
+                    "/test/image.jpg", iterations=2, use_processes=False
+                )
 
         # Should have both available and unavailable backends
         self.assertIn("wal", results)
@@ -337,17 +556,50 @@ class TestParallelUtilities(unittest.TestCase):
 class TestParallelIntegration(unittest.TestCase):
     """Test parallel processing integration."""
 
-    @mock.patch("pywal.parallel.concurrent.futures.ThreadPoolExecutor")
-    def test_thread_pool_usage(self, mock_executor):
-        """> Test that thread pool executor is used correctly."""
-        mock_executor_instance = mock.MagicMock()
-        mock_executor.return_value.__enter__.return_value = mock_executor_instance
-        mock_executor_instance.submit.return_value = mock.MagicMock()
+    @mock.patch("pywal.parallel.multiprocessing.util.Finalize")
+    def test_init_worker_flushes_cache_at_exit(self, mock_finalize):
+        """> Test workers flush queued cache writes once, when they exit."""
+        with mock.patch("pywal.parallel.cache._cache_instance"):
+            parallel._init_worker()
+
+        mock_finalize.assert_called_once_with(
+            None, parallel._flush_cache_writes, exitpriority=10
+        )
+
+    @mock.patch("pywal.parallel._list_cached_schemes", return_value=frozenset())
+    @mock.patch("pywal.parallel.ProcessPoolExecutor")
+    def test_process_pool_usage(self, mock_executor, mock_list):
+        """> Test that batches run in a process pool that preloads backends."""
+        stats = {
+            "cache_hits": 0,
+            "cache_misses": 1,
+            "backend_attempts": ["wal"],
+            "backend_successes": ["wal"],
+        }
+
+        def submit(*_args):
+            future = mock.MagicMock()
+            future.result.return_value = ({"test": "colors"}, stats)
+            return future
+
+        mock_executor.return_value.submit.side_effect = submit
 
         processor = parallel.ParallelColorProcessor(max_workers=4)
+        with mock.patch(
+            "pywal.parallel.concurrent.futures.as_completed",
+            side_effect=lambda futures: list(futures),
+        ):
+            results = processor.process_image_batch(
+                ["/test/a.jpg", "/test/b.jpg"], backends=["wal"]
+            )
 
-        # Test that max_workers is set correctly
+        # The pool is capped by the batch size, not max_workers
         self.assertEqual(processor.max_workers, 4)
+        mock_executor.assert_called_once_with(
+            max_workers=2, initializer=parallel._init_worker, initargs=(("wal",),)
+        )
+        self.assertEqual(len(results), 2)
+        self.assertEqual(processor.stats["backend_successes"]["wal"], 2)
 
     def test_error_handling(self):
         """> Test that errors are handled gracefully."""
@@ -19,6 +19,11 @@ class TestUtil(unittest.TestCase):
         result = util.read_file("tests/test_files/test_file")
         self.assertEqual(result[0], "/home/dylan/Pictures/Wallpapers/1.jpg")
 
+    def test_read_first_line(self):
+        """> Read only the first line of a file."""
+        result = util.read_first_line("tests/test_files/test_file")
+        self.assertEqual(result, "/home/dylan/Pictures/Wallpapers/1.jpg")
+
     def test_read_file_start(self):
         """> Read colors from a file."""
         result = util.read_file_json("tests/test_files/test_file.json")
@@ -29,6 +34,12 @@ class TestUtil(unittest.TestCase):
         result = util.read_file_json("tests/test_files/test_file.json")
         self.assertEqual(result["colors"]["color15"], "#F5F1F4")
 
+    def test_read_file_json_stdlib(self):
+        """> Read a json file without orjson installed."""
+        with mock.patch("pywal.util.orjson", None):
+            result = util.read_file_json("tests/test_files/test_file.json")
+        self.assertEqual(result, COLORS)
+
     def test_read_wallpaper(self):
         """> Read wallpaper from json file."""
         result = util.read_file_json("tests/test_files/test_file.json")
@@ -63,6 +74,13 @@ class TestUtil(unittest.TestCase):
         self.assertTrue(os.path.isdir(tmp_dir))
         os.rmdir(tmp_dir)
 
+    def test_create_dir_existing(self):
+        """> Skip mkdir when the directory already exists."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with mock.patch("pywal.util.os.makedirs", side_effect=AssertionError):
+                util.create_dir(tmp_dir)
+            self.assertTrue(os.path.isdir(tmp_dir))
+
     def test_hex_to_rgb_black(self):
         """> Convert #000000 to RGB."""
         result = util.hex_to_rgb("#000000")
@@ -98,6 +116,50 @@ class TestUtil(unittest.TestCase):
         result = util.lighten_color("#000000", 0.25)
         self.assertEqual(result, "#3f3f3f")
 
+    def test_validate_path(self):
+        """> Reject parent directory components but not dotted names."""
+        self.assertEqual(util.validate_path("my..cool.file"), "my..cool.file")
+        for path in ("../x", "a/../b", "a/..", "/proc/self/environ"):
+            with self.assertRaises(ValueError):
+                util.validate_path(path)
+
+    @unittest.skipUnless(os.path.isdir("/proc"), "requires /proc")
+    def test_get_pid(self):
+        """> Find running processes by name in /proc."""
+        with open("/proc/self/comm") as f:
+            own_name = f.read().strip()
+
+        with mock.patch("pywal.util._process_scan", (float("-inf"), frozenset())):
+            self.assertTrue(util.get_pid(own_name))
+            self.assertFalse(util.get_pid("not-a-real-process"))
+            self.assertFalse(util.get_pid("bad;name"))
+
+    @mock.patch("pywal.util.subprocess.Popen")
+    def test_disown(self, mock_popen):
+        """> Start a command detached in its own session."""
+        self.assertTrue(util.disown(["true"]))
+        args, kwargs = mock_popen.call_args
+        self.assertEqual(args[0], ["true"])
+        self.assertTrue(kwargs["start_new_session"])
+        self.assertIs(kwargs["stdin"], util.subprocess.DEVNULL)
+        self.assertFalse(kwargs["shell"])
+
+    def test_color_formats(self):
+        """> Export a Color in its cached integer formats."""
+        color = util.Color("#98aec2")
+        self.assertEqual(color.decimal_strip, 0x98AEC2)
+        self.assertEqual(color.decimal, "#10006210")
+        self.assertEqual(color.octal, "#46127302")
+        self.assertEqual(color.rgb, "152,174,194")
+        self.assertIs(color.rgb, color.rgb)
+
+    def test_color_lighten_percent(self):
+        """> Lighten a Color by a template or numeric percent."""
+        color = util.Color("#000000")
+        self.assertEqual(color.lighten("25%").hex_color, "#3f3f3f")
+        self.assertEqual(color.lighten(25).hex_color, "#3f3f3f")
+        self.assertEqual(color.lighten(12.5).hex_color, "#1f1f1f")
+
 
 if __name__ == "__main__":
     unittest.main()